@@ -1,6 +1,6 @@
 
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from database.camera.camera_settings import CameraSettings
 
@@ -22,3 +22,10 @@ class CameraUpdate(BaseModel):
     status: Optional[bool] = None
     settings_id: Optional[int] = None
 
+
+class ReplayCameraCreate(BaseModel):
+    source_path: str  # Video file or directory of images
+    model: Optional[str] = None
+    frame_rate: float = 25.0
+    replay_jitter_ms: float = Field(0.0, ge=0)
+    replay_drop_rate: float = Field(0.0, ge=0, lt=1)  # A rate of 1 would drop every frame
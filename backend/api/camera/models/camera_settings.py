@@ -1,5 +1,5 @@
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class CameraSettingsBase (BaseModel) :
@@ -12,6 +12,23 @@ class CameraSettingsBase (BaseModel) :
     gain : float
    
     white_balance : float
+
+    offset_x: Optional[int] = None
+    offset_y: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    binning_horizontal: Optional[int] = None
+    binning_vertical: Optional[int] = None
+    decimation_horizontal: Optional[int] = None
+    decimation_vertical: Optional[int] = None
+
+    trigger_mode: Optional[str] = None
+    trigger_source: Optional[str] = None
+    trigger_activation: Optional[str] = None
+
+    frame_rate: Optional[float] = None
+    replay_jitter_ms: Optional[float] = Field(None, ge=0)
+    replay_drop_rate: Optional[float] = Field(None, ge=0, lt=1)
    
 
 class CameraSettingsCreate(CameraSettingsBase):
@@ -29,6 +46,23 @@ class UpdateCameraSettings(BaseModel):
     
     white_balance: Optional[str] = None
 
+    offset_x: Optional[int] = None
+    offset_y: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    binning_horizontal: Optional[int] = None
+    binning_vertical: Optional[int] = None
+    decimation_horizontal: Optional[int] = None
+    decimation_vertical: Optional[int] = None
+
+    trigger_mode: Optional[str] = None
+    trigger_source: Optional[str] = None
+    trigger_activation: Optional[str] = None
+
+    frame_rate: Optional[float] = None
+    replay_jitter_ms: Optional[float] = Field(None, ge=0)
+    replay_drop_rate: Optional[float] = Field(None, ge=0, lt=1)
+
     class Config:
         orm_mode = True
 
@@ -4,24 +4,34 @@ from typing import Annotated, Generator, List, Tuple, Optional
 import cv2
 from fastapi import APIRouter, Depends, HTTPException, Response
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from api.utils.database import get_db
-from api.camera.models.camera import CameraBase
+from api.camera.models.camera import CameraBase, ReplayCameraCreate
 from api.camera.models.camera_settings import UpdateCameraSettings
 from database.camera.camera import Camera
 from hardware.camera.camera import FrameSource
+from hardware.camera.camera_manager import camera_manager
+from detection.service.stream_hub import stream_hubs
 import re
 
 router = APIRouter()
 db_dependency = Annotated[Session, Depends(get_db)]
 
-frame_source = FrameSource()
+# Camera held open by the preview page; the device itself is shared through camera_manager
+preview_camera_id: Optional[int] = None
+
+
+def get_preview_source() -> Optional[FrameSource]:
+    if preview_camera_id is None:
+        return None
+    return camera_manager.get(preview_camera_id)
 
 
 @router.get("/get-index")
 def get_camera_index(camera_id: int, db: db_dependency):
-    camera_index = frame_source.get_camera_by_index(camera_id, db)
+    camera_index = FrameSource.get_camera_by_index(camera_id, db)
     if camera_index is None:
         raise HTTPException(status_code=404, detail=f"Camera with id {camera_id} not found")
     return {"camera_index": camera_index}
@@ -31,7 +41,7 @@ def get_camera_index(camera_id: int, db: db_dependency):
 @router.get("/cameras/", response_model=List[Tuple[int, str]])
 def read_cameras(db:db_dependency):
 
-    cameras = frame_source.get_camera_model_and_ids(db)
+    cameras = FrameSource.get_camera_model_and_ids(db)
     if not cameras:
         raise HTTPException(status_code=404, detail="No cameras found")
     return cameras
@@ -43,15 +53,70 @@ class CameraID(BaseModel):
 # Endpoint to start a specific camera
 @router.post("/start-camera")
 def start_camera(camera: CameraID, db: db_dependency):
-    frame_source.start(camera.camera_id, db)
-    
+    global preview_camera_id
+    if preview_camera_id == camera.camera_id:
+        print("Camera is already running.")
+        return {"message": "Camera started"}
+    if preview_camera_id is not None:
+        camera_manager.release(preview_camera_id)
+        preview_camera_id = None
+
+    camera_manager.acquire(camera.camera_id, db)
+    preview_camera_id = camera.camera_id
     return {"message": "Camera started"}
 
 
 
 @router.get("/video_feed")
-def video_feed():
-    return StreamingResponse(frame_source.generate_frames(), media_type="multipart/x-mixed-replace; boundary=frame")
+async def video_feed():
+    frame_source = get_preview_source()
+    if frame_source is None:
+        raise HTTPException(status_code=400, detail="Camera is not running. Please start the camera first.")
+    # Every viewer of the preview shares one reader and one JPEG encode per frame
+    stream = stream_hubs.subscribe(("preview", preview_camera_id),
+                                   lambda: iterate_in_threadpool(frame_source.generate_frames()))
+    return StreamingResponse(stream, media_type="multipart/x-mixed-replace; boundary=frame")
+
+
+@router.post("/replay")
+def register_replay_camera(replay: ReplayCameraCreate, db: db_dependency):
+    """Register a video file or image directory as a camera that replays at a fixed frame rate."""
+    if not os.path.exists(replay.source_path):
+        raise HTTPException(status_code=404, detail=f"Replay source {replay.source_path} not found")
+
+    camera = FrameSource.save_camera_info(db, {
+        "camera_type": "replay",
+        "serial_number": None,
+        "source_path": os.path.abspath(replay.source_path),
+        "model": replay.model or os.path.basename(os.path.normpath(replay.source_path)),
+        "settings": {
+            "frame_rate": replay.frame_rate,
+            "replay_jitter_ms": replay.replay_jitter_ms,
+            "replay_drop_rate": replay.replay_drop_rate,
+        },
+    })
+    return {"camera_id": camera.id}
+
+
+@router.post("/{camera_id}/trigger")
+def trigger_camera(camera_id: int):
+    """Fire a software trigger on a running camera and return the resulting frame with its camera timestamp."""
+    frame_source = camera_manager.get(camera_id)
+    if frame_source is None:
+        raise HTTPException(status_code=400, detail="Camera is not running. Please start the camera first.")
+    try:
+        frame, frame_info = frame_source.trigger()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SystemError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    _, buffer = cv2.imencode('.jpg', frame)
+    headers = {
+        "X-Frame-Counter": str(frame_info.get("frame_counter")),
+        "X-Camera-Timestamp": str(frame_info.get("camera_timestamp")),
+    }
+    return Response(content=buffer.tobytes(), media_type="image/jpeg", headers=headers)
 
 
 @router.get("/camera_info/{camera_id}")
@@ -60,12 +125,14 @@ def get_camera_info(camera_id: int , db: db_dependency):
 
 @router.put("/{camera_id}")
 async def change_camera_settings(camera_id: int, camera_settings_update: UpdateCameraSettings, db: db_dependency):
-    return FrameSource.change_camera_settings(camera_id, camera_settings_update, db)
+    # Applied live to the running device, if any, and persisted for the next start
+    return FrameSource.change_camera_settings(camera_id, camera_settings_update, db, running_source=camera_manager.get(camera_id))
 
 #didn't use this :
 @router.get("/frame/{piece_label}")
 async def get_frame(db: db_dependency, piece_label: str):
-    if not frame_source.camera_is_running:
+    frame_source = get_preview_source()
+    if frame_source is None or not frame_source.camera_is_running:
         raise HTTPException(status_code=400, detail="Camera is not running. Please start the camera first.")
     
     match = re.match(r'([A-Z]\d{3}\.\d{5})', piece_label)
@@ -94,7 +161,8 @@ async def get_frame(db: db_dependency, piece_label: str):
 # this is what will capture the images for the dataset
 @router.get("/capture_images/{piece_label}")
 async def capture_images( piece_label: str):
-    if not frame_source.camera_is_running:
+    frame_source = get_preview_source()
+    if frame_source is None or not frame_source.camera_is_running:
         raise HTTPException(status_code=400, detail="Camera is not running. Please start the camera first.")
     
     # Extract the part before the dot in the format "A123.4567"
@@ -123,12 +191,17 @@ async def capture_images( piece_label: str):
 
 @router.post("/cleanup-temp-photos")
 async def cleanup_temp_photos_endpoint():
-    frame_source.cleanup_temp_photos()
+    frame_source = get_preview_source()
+    if frame_source is not None:
+        frame_source.cleanup_temp_photos()
     return {"message": "Temporary photos cleaned up successfully"}
 
 
 @router.post("/save-images")
 def save_images(db: db_dependency, piece_label: str):
+    frame_source = get_preview_source()
+    if frame_source is None:
+        raise HTTPException(status_code=400, detail="Camera is not running. Please start the camera first.")
     try:
         frame_source.save_images_to_database(db,  piece_label)
     except SystemError as e:
@@ -139,13 +212,19 @@ def save_images(db: db_dependency, piece_label: str):
 
 @router.post("/stop")
 def stop_camera():
-    frame_source.stop()
+    global preview_camera_id
+    if preview_camera_id is None:
+        print("Camera is not running.")
+    else:
+        camera_manager.release(preview_camera_id)
+        preview_camera_id = None
     return {"message": "Camera stopped"}
 
 @router.get("/check_camera")
 async def check_camera():
     try:
-        camera_status = frame_source._check_camera()
+        frame_source = get_preview_source()
+        camera_status = frame_source is not None and frame_source.camera_is_running
         return {"camera_opened": camera_status}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
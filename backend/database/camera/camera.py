@@ -2,7 +2,7 @@ from sqlalchemy import Boolean, String, Column,Integer,ForeignKey
 from database.defectDetectionDB import Base
 from sqlalchemy.orm import relationship
 
-from sqlalchemy import Boolean, String, Column, Integer, ForeignKey
+from sqlalchemy import Boolean, String, Column, Integer, ForeignKey, DateTime
 from database.defectDetectionDB import Base
 from sqlalchemy.orm import relationship
 
@@ -10,10 +10,16 @@ class Camera(Base):
     __tablename__ = 'camera'
 
     id = Column(Integer, primary_key=True, index=True)
-    camera_type = Column(String, nullable=False)  # "regular" or "industrial"
+    camera_type = Column(String, nullable=False)  # "regular", "basler" or "replay"
     camera_index = Column(Integer, nullable=True)  # For regular cameras
     serial_number = Column(String, unique=True, nullable=True)  # For industrial cameras
+    source_path = Column(String, nullable=True)  # For replay cameras: video file or image directory
     model = Column(String, index=True)  
     status = Column(Boolean, default=False)
+    # Stable identity of the device as enumerated (type, serial/device id, model); known fingerprints are not re-probed
+    fingerprint = Column(String, unique=True, index=True, nullable=True)
+    # Whether the device was present in the last enumeration, and when it was last seen
+    connected = Column(Boolean, default=False)
+    last_seen = Column(DateTime, nullable=True)
     settings_id = Column(Integer, ForeignKey('cameraSettings.id'))
     sittings = relationship("CameraSettings", back_populates="camera")
\ No newline at end of file
@@ -18,11 +18,31 @@ class CameraSettings (Base):
     aperture= Column (Float,nullable=True)
     #Adjusts the camera's sensitivity to light.
     gain = Column(Integer,nullable=True)
-    # #Specifies how many frames (images) per second the camera captures.FPS
-    # frame_rate =Column(Integer)
+    #Specifies how many frames (images) per second the camera captures.FPS (used by replay cameras)
+    frame_rate = Column(Float, nullable=True)
     #Adjusts the color balance of the image to accurately represent colors under different lighting conditions.
     white_balance = Column(String,nullable=True)
     # #Specifies the size and detail of the image or video in terms of pixels.
     # resolution = Column(String)
+    # Sensor region of interest (Basler). Only these pixels leave the camera.
+    offset_x = Column(Integer, nullable=True)
+    offset_y = Column(Integer, nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    # On-sensor binning: sums/averages neighbouring pixels, dividing the resolution.
+    binning_horizontal = Column(Integer, nullable=True)
+    binning_vertical = Column(Integer, nullable=True)
+    # On-sensor decimation: skips rows/columns, dividing the resolution.
+    decimation_horizontal = Column(Integer, nullable=True)
+    decimation_vertical = Column(Integer, nullable=True)
+    # Acquisition trigger (Basler): "off" (free-running), "software" or "hardware".
+    trigger_mode = Column(String, nullable=True)
+    # Input line used by the hardware trigger, e.g. "Line1".
+    trigger_source = Column(String, nullable=True)
+    # Edge of the hardware trigger signal: "RisingEdge" or "FallingEdge".
+    trigger_activation = Column(String, nullable=True)
+    # Replay cameras: random +/- delay per frame in milliseconds, and probability of dropping a frame.
+    replay_jitter_ms = Column(Float, nullable=True)
+    replay_drop_rate = Column(Float, nullable=True)
 
     camera = relationship("Camera", back_populates="sittings", uselist=True)
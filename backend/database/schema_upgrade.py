@@ -0,0 +1,41 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from database.camera.camera import Camera
+from database.camera.camera_settings import CameraSettings
+
+# Columns added to existing tables after they were first created. create_all() only creates
+# missing tables, so on an existing database these are added by upgrade_schema() at startup.
+ADDED_COLUMNS = {
+    CameraSettings: [
+        # Sensor ROI, binning and decimation (Basler)
+        "offset_x", "offset_y", "width", "height",
+        "binning_horizontal", "binning_vertical", "decimation_horizontal", "decimation_vertical",
+        # Acquisition trigger (Basler)
+        "trigger_mode", "trigger_source", "trigger_activation",
+        # Replay cameras
+        "frame_rate", "replay_jitter_ms", "replay_drop_rate",
+    ],
+    Camera: [
+        "source_path",
+        # Hot-plug detection
+        "fingerprint", "connected", "last_seen",
+    ],
+}
+
+
+def upgrade_schema(engine: Engine):
+    """Add the columns (and their indexes) listed in ADDED_COLUMNS; safe to run on every start."""
+    with engine.begin() as connection:
+        for model, column_names in ADDED_COLUMNS.items():
+            table = model.__table__
+            for name in column_names:
+                column = table.columns[name]
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(
+                    f'ALTER TABLE "{table.name}" ADD COLUMN IF NOT EXISTS "{column.name}" {column_type}'
+                ))
+            for index in table.indexes:
+                if any(indexed.name in column_names for indexed in index.columns):
+                    index.create(bind=connection, checkfirst=True)
+    print("Database schema is up to date.")
@@ -1,16 +1,25 @@
 import cv2
 import asyncio
-import io
+import functools
 import logging
 import threading
 import numpy as np
-from typing import Annotated, AsyncGenerator
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Annotated, AsyncGenerator, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from detection.service.model_training_service import train_model, stop_training
-from detection.service.detection_service import DetectionSystem
-from hardware.camera.camera import FrameSource
+from detection.service.model_training_service import distill_model, train_model, stop_training
+from detection.service.batch_inference import BatchInferenceEngine
+from detection.service.inference_pool import inference_pool
+from detection.service.motion_gate import MotionGate, parse_roi
+from detection.service.frame_scheduler import AdaptiveFrameScheduler
+from detection.service.stream_pipeline import END, StreamPipeline
+from detection.service.stream_hub import stream_hubs
+from detection.service.tracker import PieceTracker
+from detection.service.decision_engine import FAIL, DecisionEngine
+from detection.service.postprocessing import Detections, count_targets, draw_detections, target_colors
+from detection.service.model_service import MODEL_SCALES, default_backend, export_model, get_inference_model_path
+from hardware.camera.camera_manager import camera_manager
 from api.utils.database import get_db
 import time
 from database.inspection.InspectionImage import InspectionImage
@@ -29,118 +38,239 @@ router = APIRouter()
 db_dependency = Annotated[Session, Depends(get_db)]
 stop_event = threading.Event()  # Event to signal when to stop
 
-# Initialize FrameSource and DetectionSystem
-frame_source = FrameSource()
-detection_system = None  # We'll initialize this globally to avoid loading it multiple times.
+# Cameras are shared through camera_manager; the model runs in the inference worker processes
+# Frames from every open feed go through one engine so that concurrent cameras share forward passes
+detection_engine = None
 
 async def load_model_once():
-    """Load the model once when the application starts to avoid reloading it for each frame."""
-    global detection_system
-    if detection_system is None:
-        detection_system = DetectionSystem()
-        detection_system.get_my_model()  # Load the model once
+    """Check the model is available and start batching frames into the inference workers."""
+    global detection_engine
+    if not os.path.exists(get_inference_model_path(default_backend())):
+        raise HTTPException(status_code=404, detail="Model not found.")
+    if detection_engine is None:
+        # Workers only return the detections; the feeds draw them in their encode stage
+        detection_engine = BatchInferenceEngine(
+            functools.partial(inference_pool.dispatch, "detection", draw=False), name="detection")
+        detection_engine.start()
 
 
 async def process_frame(frame: np.ndarray, target_label: str):
-    """Asynchronously process a single frame to perform detection and contouring."""
+    """
+    Asynchronously run detection on a single frame.
+    Returns (detections, detected_target, non_target_count); drawing is left to the caller (see render_frame).
+    """
     try:
-        detection_results = detection_system.detect_and_contour(frame, target_label)
-        if isinstance(detection_results, tuple):
-            processed_frame = detection_results[0]
-            detected_target = detection_results[1] if len(detection_results) > 1 else False
-            non_target_count = detection_results[2] if len(detection_results) > 2 else 0
-        else:
-            processed_frame = detection_results
-            detected_target = False
-            non_target_count = 0
-        
-        return processed_frame, detected_target, non_target_count
+        detections = await detection_engine.infer(frame)
+        detected_target, non_target_count = count_targets(detections, target_label)
+        return detections, detected_target, non_target_count
     except cv2.error as e:
         logging.error(f"OpenCV error: {e}")
-        return frame, False, 0
+        return Detections.empty(), False, 0
     except Exception as e:
         logging.error(f"Unexpected error: {e}")
-        return frame, False, 0
-
-
-async def generate_frames(camera_id: int, target_label: str, db: Session) -> AsyncGenerator[bytes, None]:
-    """Generate video frames asynchronously and perform detection on them."""
-    frame_source.start(camera_id, db)
+        return Detections.empty(), False, 0
+
+
+async def process_frames(frames: List[np.ndarray], target_label: str):
+    """Run detection on one frame per camera; the engine batches them into a single forward pass."""
+    return list(await asyncio.gather(*(process_frame(frame, target_label) for frame in frames)))
+
+
+def render_frame(frame: np.ndarray, detections: Detections, target_label: str) -> np.ndarray:
+    """Overlay step: draw the detections on the frame, green for the target label and red for others."""
+    return draw_detections(frame, detections, target_colors(detections, target_label))
+
+
+def compose_mosaic(frames: List[np.ndarray], tile_height: int = 480) -> np.ndarray:
+    """Tile the per-camera frames into one image (one row for 2 cameras, a 2-column grid above that)."""
+    if len(frames) == 1:
+        return frames[0]
+    tiles = [cv2.resize(frame, (int(frame.shape[1] * tile_height / frame.shape[0]), tile_height)) for frame in frames]
+    tile_width = max(tile.shape[1] for tile in tiles)
+    tiles = [cv2.copyMakeBorder(tile, 0, 0, 0, tile_width - tile.shape[1], cv2.BORDER_CONSTANT) for tile in tiles]
+    columns = len(tiles) if len(tiles) <= 2 else 2
+    if len(tiles) % columns:
+        tiles.append(np.zeros_like(tiles[0]))
+    rows = [cv2.hconcat(tiles[i:i + columns]) for i in range(0, len(tiles), columns)]
+    return cv2.vconcat(rows)
+
+
+async def generate_frames(camera_ids: List[int], target_label: str, db: Session,
+                          roi: Optional[Tuple[int, int, int, int]] = None) -> AsyncGenerator[bytes, None]:
+    """
+    Generate video frames asynchronously and perform detection on them, across one or more cameras.
+    Capture, inference and encoding run as overlapping pipeline stages that always work on the newest frame.
+    The model only runs on a camera whose `roi` changed since its last detection; otherwise that result is reused.
+    Target presence comes from a per-camera decision window, and a camera with a stable verdict pauses the model.
+    Between model runs each camera's tracker carries the boxes forward, so overlays follow the pieces on every frame.
+    """
+    # Opening and closing a device blocks for seconds (node-map writes, grab thread join): keep it off the event loop
+    frame_sources = []
+    try:
+        for camera_id in camera_ids:
+            frame_sources.append(await asyncio.to_thread(camera_manager.acquire, camera_id, db))
+    except Exception:
+        for source in frame_sources:
+            await asyncio.to_thread(camera_manager.release, source.cam_id)
+        raise
     
     detection_time = time.time()
     timeout_duration = 60  # seconds
     object_detected = False  # To track whether an object has been detected
 
-    frame_counter = 0
-    process_interval = 5  # Process every 5 frames
-    
-    try:
-        while not stop_event.is_set():
-            logging.debug("Stop event not set, continuing loop.")
-            if frame_source.camera_is_running:
-                logging.debug("Camera is running.")
-                frame = frame_source.frame()
-                if frame is None:
-                    logging.debug("No frame captured.")
-                    await asyncio.sleep(0)  # Yield control to the event loop
-                    continue
-
-                # Process only every N frames to reduce load
-                if frame_counter % process_interval == 0:
-                    if not isinstance(frame, np.ndarray):
-                        logging.error("Captured frame is not a NumPy array.")
-                        continue
-
-                    if frame.ndim != 3 or frame.dtype != np.uint8:
-                        logging.error(f"Frame dimensions or data type are incorrect. Dimensions: {frame.ndim}, Data type: {frame.dtype}")
-                        continue
-
-                    processed_frame, detected_target, non_target_count = await process_frame(frame, target_label)
-
-                    if non_target_count > 0:
-                        logging.error(f"Detected {non_target_count} pieces that do not belong.")
-                    
-                    if detected_target:
-                        object_detected = True
-                        detection_time = time.time()
-                    
-                    if processed_frame.shape[2] == 3:
-                        _, buffer = cv2.imencode('.jpg', processed_frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-                        if not _:
-                            logging.error("Failed to encode frame.")
-                            continue
-
-                        image_stream = io.BytesIO(buffer)
-                        yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + image_stream.getvalue() + b'\r\n')
-                    else:
-                        logging.error("Processed frame is not in BGR format.")
-                    
-                frame_counter += 1
+    scheduler = AdaptiveFrameScheduler()  # Picks how often to run the model from measured latency
+    last_seqs = [-1] * len(frame_sources)
+    motion_gates = [MotionGate(roi) for _ in frame_sources]
+    last_results = [None] * len(frame_sources)
+    trackers = [PieceTracker() for _ in frame_sources]  # Stable piece ids; boxes carried forward between model runs
+    decisions = [DecisionEngine(target_label) for _ in frame_sources]  # Verdicts over a window of processed frames
+
+    async def capture():
+        """Acquisition stage: the newest frame of every camera, or END when the feed must stop."""
+        nonlocal last_seqs
+        if stop_event.is_set():
+            return END
+        if not all(source.camera_is_running for source in frame_sources):
+            logging.debug("Camera is not running.")
+            return END
+        # Timeout logic if no object is detected
+        if time.time() - detection_time > timeout_duration and not object_detected:
+            logging.debug("Timeout reached without object detection, stopping.")
+            return END
+
+        # Wait off the event loop for a new frame from every camera; each has its own grab thread
+        try:
+            reads = await asyncio.gather(*(
+                asyncio.to_thread(source.read, last_seq, 5.0, True)
+                for source, last_seq in zip(frame_sources, last_seqs)
+            ))
+        except SystemError:
+            # No new frame within the timeout, e.g. a triggered camera waiting for its next part:
+            # keep the previous sequence numbers and wait again instead of ending the feed
+            logging.debug("No new frame yet.")
+            return None
+        frames = [frame for frame, _ in reads]
+        frame_infos = [frame_info for _, frame_info in reads]
+        last_seqs = [frame_info["seq"] for frame_info in frame_infos]
+        scheduler.observe_frame()
+
+        if any(frame is None or frame.ndim != 3 or frame.dtype != np.uint8 for frame in frames):
+            logging.error("Frame dimensions or data type are incorrect.")
+            return None
+        return frames, frame_infos
+
+    async def infer(captured):
+        """
+        Inference stage: on the cameras whose scene changed or whose tracks are not settled, run the model when
+        their tracks need a fresh detection and the scheduler's interval has elapsed; otherwise carry the tracked
+        boxes forward.
+        """
+        nonlocal detection_time, object_detected
+        frames, frame_infos = captured
+        now = time.time()
+        timestamps = [frame_info.get("timestamp", now) for frame_info in frame_infos]
+
+        moved = [gate.changed(frame) for gate, frame in zip(motion_gates, frames)]
+        for index, gate in enumerate(motion_gates):
+            # A real change (piece removed or swapped) ends a stable verdict's hold; the gate's periodic refresh does not
+            if moved[index] and not gate.refreshed:
+                decisions[index].end_hold()
+        # Only the cameras whose scene changed are updated, plus those whose tracks still need the model
+        # (unconfirmed or drifting); the others keep showing their last result
+        changed = [index for index in range(len(frames))
+                   if moved[index] or last_results[index] is None or trackers[index].unsettled(timestamps[index])]
+        if not changed:
+            return None
+
+        # A camera whose verdict is stable skips the model until the hold expires
+        detect = [index for index in changed if last_results[index] is None
+                  or (decisions[index].should_infer() and trackers[index].needs_detection(timestamps[index]))]
+        # Process the newest frames once the scheduler's interval has elapsed
+        if detect and not scheduler.should_process():
+            detect = [index for index in detect if last_results[index] is None]
+        if detect:
+            started = time.time()
+            fresh_results = await process_frames([frames[index] for index in detect], target_label)
+            scheduler.record(min(timestamps[index] for index in detect), started)
+            for index, result in zip(detect, fresh_results):
+                # Only a frame the model ran on becomes the gate's reference, so a skipped change is reported again
+                motion_gates[index].accept(frames[index])
+                trackers[index].update(result[0], timestamps[index])
+                previous_verdict = decisions[index].verdict
+                if decisions[index].observe(result[0]) != previous_verdict:
+                    logging.info(f"Camera {camera_ids[index]}: verdict {decisions[index].verdict} "
+                                 f"(scores {decisions[index].scores()})")
+
+        for index in changed:
+            tracked = trackers[index].predict(timestamps[index])
+            # Presence comes from the decision window, not from this frame, so one bad frame cannot flip it
+            _, non_target_count = count_targets(tracked, target_label)
+            last_results[index] = (tracked, decisions[index].target_present,
+                                   non_target_count if decisions[index].foreign_present else 0)
+
+        detected_target = any(result[1] for result in last_results)
+        non_target_count = sum(result[2] for result in last_results)
+
+        if non_target_count > 0 and any(decisions[index].verdict == FAIL for index in detect):
+            logging.error(f"Detected {non_target_count} pieces that do not belong.")
 
-                # Timeout logic if no object is detected
-                if time.time() - detection_time > timeout_duration and not object_detected:
-                    logging.debug("Timeout reached without object detection, stopping.")
-                    break
-            else:
-                logging.debug("Camera is not running.")
-                break
+        if detected_target:
+            object_detected = True
+            detection_time = time.time()
+
+        return frames, [result[0] for result in last_results]
+
+    def overlay_and_encode(frames, detections):
+        processed_frame = compose_mosaic([render_frame(frame, frame_detections, target_label)
+                                          for frame, frame_detections in zip(frames, detections)])
+        if processed_frame.shape[2] != 3:
+            logging.error("Processed frame is not in BGR format.")
+            return False, None
+        return cv2.imencode('.jpg', processed_frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
+
+    async def encode(inferred):
+        """Overlay/encode stage: draw, tile the cameras and JPEG-encode off the event loop."""
+        success, buffer = await asyncio.to_thread(overlay_and_encode, *inferred)
+        if not success:
+            logging.error("Failed to encode frame.")
+            return None
+        return (b'--frame\r\n'
+                b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
 
-            await asyncio.sleep(0)  # Yield control to the event loop
+    try:
+        # Each stage runs on its own task; the send stage is this generator, driven by the response
+        async for chunk in StreamPipeline(capture, [infer, encode], name="detection feed"):
+            yield chunk
 
     finally:
         logging.debug("Stopping frame source.")
         stop_video()
         stop_event.clear()  # Clear the event for the next use
-        frame_source.stop()
+        for camera_id in camera_ids:
+            await asyncio.to_thread(camera_manager.release, camera_id)
         logging.debug("Stop event cleared.")
 
 
 @router.get("/video_feed")
-async def video_feed(camera_id: int, target_label: str, db: Session = Depends(get_db)):
+async def video_feed(target_label: str, camera_id: Optional[int] = None, camera_ids: List[int] = Query(default=[]),
+                     roi: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Stream detection on one camera (`camera_id`) or several at once (`camera_ids=1&camera_ids=2`).
+    `roi=x,y,width,height` limits the change detection that decides when the model runs.
+    """
+    camera_ids = list(dict.fromkeys(camera_ids + ([camera_id] if camera_id is not None else [])))
+    if not camera_ids:
+        raise HTTPException(status_code=400, detail="Provide camera_id or at least one camera_ids value.")
+    try:
+        roi = parse_roi(roi)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     # Ensure the model is loaded once before generating frames
     await load_model_once()
-    return StreamingResponse(generate_frames(camera_id, target_label, db), media_type='multipart/x-mixed-replace; boundary=frame')
+    # Viewers of the same cameras, target and roi share one pipeline: each frame is inferred and encoded once
+    stream = stream_hubs.subscribe(("detection", tuple(camera_ids), target_label, roi),
+                                   lambda: generate_frames(camera_ids, target_label, db, roi))
+    return StreamingResponse(stream, media_type='multipart/x-mixed-replace; boundary=frame')
 
 
 def stop_video():
@@ -150,15 +280,58 @@ def stop_video():
 
 
 @router.post("/train/{piece_label}")
-def train_piece_model(piece_label: str, db: Session = Depends(get_db)):
+def train_piece_model(piece_label: str, model_scale: str = "x", db: Session = Depends(get_db)):
+    if model_scale not in MODEL_SCALES:
+        raise HTTPException(status_code=400, detail=f"model_scale must be one of {MODEL_SCALES}.")
     try:
         # Call the train_model function
-        train_model(piece_label, db)
+        train_model(piece_label, db, model_scale)
         return {"message": "Training process started. Check logs for updates."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
 
 
+@router.post("/distill/{model_scale}")
+def distill_piece_model(model_scale: str, teacher_scale: str = "x"):
+    """Train a smaller model tier from the teacher's predictions; serve it with MODEL_SCALE=<model_scale>."""
+    if model_scale not in MODEL_SCALES or teacher_scale not in MODEL_SCALES:
+        raise HTTPException(status_code=400, detail=f"Model scales must be one of {MODEL_SCALES}.")
+    try:
+        distill_model(model_scale, teacher_scale)
+        return {"message": "Distillation process started. Check logs for updates."}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
+
+
+@router.post("/export/{backend}")
+def export_piece_model(backend: str, imgsz: Optional[int] = None):
+    """Export the detection model for the onnx or openvino inference backend (INFERENCE_BACKEND)."""
+    if backend not in ("onnx", "openvino"):
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {backend}")
+    try:
+        exported = export_model(backend, imgsz)
+        return {"message": "Model exported.", "path": str(exported)}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
+
+
+@router.post("/quantize/{backend}")
+def quantize_piece_model(backend: str):
+    """Build the INT8 onnx or openvino model from the validation images and report its mAP against FP32."""
+    if backend not in ("onnx", "openvino"):
+        raise HTTPException(status_code=400, detail=f"Unsupported quantisation backend: {backend}")
+    try:
+        # Imported here: quantisation pulls in onnxruntime/nncf, which the API process does not otherwise need
+        from detection.service.quantization_service import quantize_model
+        return quantize_model(backend)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
+
+
 @router.post("/stop_training")
 async def stop_training_yolo():
     try:
@@ -180,6 +353,8 @@ async def stop_camera_feed():
 
 # Directory to save captured images
 SAVE_DIR = "captured_images"
+# Longest a capture keeps collecting frames for a stable verdict, in seconds
+CAPTURE_DECISION_TIMEOUT = 3.0
 
 if not os.path.exists(SAVE_DIR):
     os.makedirs(SAVE_DIR)  # Create the directory if it doesn't exist
@@ -188,17 +363,24 @@ async def capture_frame(camera_id: int,of: str, target_label: str, user_id:str,
     await load_model_once()  
     
   
-    frame_source.start(camera_id, db)
+    frame_source = await asyncio.to_thread(camera_manager.acquire, camera_id, db)
     
     try:
-        frame = frame_source.frame()
+        # Decide over consecutive frames rather than on the first one grabbed
+        decision = DecisionEngine(target_label)
+        frame, detections, last_seq = None, Detections.empty(), -1
+        deadline = time.time() + CAPTURE_DECISION_TIMEOUT
+        while not decision.stable and time.time() < deadline:
+            frame, frame_info = await asyncio.to_thread(frame_source.read, last_seq, 5.0, True)
+            last_seq = frame_info["seq"]
+            detections, _, _ = await process_frame(frame, target_label)
+            decision.observe(detections)
         if frame is None:
             raise HTTPException(status_code=500, detail="No frame captured from the camera.")
         
-        # Detect object in the frame
-        processed_frame, detected_target, _ = await process_frame(frame, target_label)
+        processed_frame = render_frame(frame, detections, target_label)
         
-        if detected_target:
+        if decision.target_present:
             # Save the frame with the detected object
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             image_name = f"captured_{target_label}_{timestamp}_{user_id}.jpg"
@@ -242,15 +424,18 @@ async def capture_frame(camera_id: int,of: str, target_label: str, user_id:str,
                     logging.error(f"Error saving image details to the database: {str(e)}")
                     raise HTTPException(status_code=500, detail=f"An error occurred while saving image details: {str(e)}")
                                 
-                return {"message": "Image captured and saved.", "file_path": image_path, "db_entry": inspection_image.id}
+                return {"message": "Image captured and saved.", "file_path": image_path, "db_entry": inspection_image.id,
+                        "verdict": decision.verdict}
             else:
                 raise HTTPException(status_code=500, detail="Processed frame is not in the correct format (BGR).")
         else:
-            return {"message": "No target object detected in the frame."}
+            return {"message": "No target object detected in the frame.", "verdict": decision.verdict}
     
     except Exception as e:
         logging.error(f"Error capturing frame: {e}")
         raise HTTPException(status_code=500, detail=f"An error occurred while capturing the frame: {e}")
+    finally:
+        await asyncio.to_thread(camera_manager.release, camera_id)
     
     
         
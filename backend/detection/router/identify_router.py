@@ -1,16 +1,21 @@
 import asyncio
-
-import io
+import functools
 
 from fastapi.responses import StreamingResponse
 from detection.service.model_training_service import train_model
-from detection.service.identifiying_service import IdentifySystem
-from hardware.camera.camera import FrameSource
+from detection.service.batch_inference import BatchInferenceEngine
+from detection.service.inference_pool import inference_pool
+from detection.service.motion_gate import MotionGate, parse_roi
+from detection.service.frame_scheduler import AdaptiveFrameScheduler
+from detection.service.stream_pipeline import END, StreamPipeline
+from detection.service.tracker import PieceTracker
+from detection.service.postprocessing import Detections, class_colors, draw_detections
+from hardware.camera.camera_manager import camera_manager
 from api.utils.database import get_db
 import time
 import logging
 import threading
-from typing import Annotated, AsyncGenerator
+from typing import Annotated, AsyncGenerator, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 import numpy as np
@@ -29,102 +34,137 @@ router = APIRouter()
 db_dependency = Annotated[Session, Depends(get_db)]
 stop_event = threading.Event()  # Event to signal when to stop
 
-# Initialize FrameSource and DetectionSystem
-frame_source = FrameSource()
-identify_system = IdentifySystem()
+# Cameras are shared through camera_manager; the model runs in the inference worker processes
+# Workers only return the detections; the feed draws them in its encode stage
+identify_engine = BatchInferenceEngine(
+    functools.partial(inference_pool.dispatch, "identify", draw=False), name="identify")
 
 
 
 async def process_frame(frame: np.ndarray):
-    """Asynchronously process a single frame to perform detection and contouring."""
+    """
+    Asynchronously run detection on a single frame.
+    Returns (detections, detected_count, non_target_count); the frame is drawn in the encode stage.
+    """
     try:
-        detection_results = identify_system.detect_and_contour(frame)
-        if isinstance(detection_results, tuple):
-            processed_frame = detection_results[0]
-            detected_target = detection_results[1] if len(detection_results) > 1 else False
-            non_target_count = detection_results[2] if len(detection_results) > 2 else 0
-        else:
-            processed_frame = detection_results
-            detected_target = False
-            non_target_count = 0
-        
-        return processed_frame, detected_target, non_target_count
+        detections = await identify_engine.infer(frame)
+        return detections, len(detections), 0
     except cv2.error as e:
         logging.error(f"OpenCV error: {e}")
-        return frame, False, 0
+        return Detections.empty(), 0, 0
     except Exception as e:
         logging.error(f"Unexpected error: {e}")
-        return frame, False, 0
+        return Detections.empty(), 0, 0
     
 
-async def generate_frame (camera_id: int, db: Session)-> AsyncGenerator[bytes, None]:
-    # Frame generation logic
-    frame_source.start(camera_id, db)
+async def generate_frame (camera_id: int, db: Session, roi: Optional[Tuple[int, int, int, int]] = None)-> AsyncGenerator[bytes, None]:
+    # Frame generation logic; the model only runs when the scene inside `roi` changed since the last detection
+    # Opening and closing a device blocks for seconds (node-map writes, grab thread join): keep it off the event loop
+    frame_source = await asyncio.to_thread(camera_manager.acquire, camera_id, db)
     
     detection_time = time.time()
     timeout_duration = 60  # seconds
     object_detected = False  # To track whether an object has been detected
 
-    frame_counter = 0
-    process_interval = 5  # Process every 5 frames
-    
+    scheduler = AdaptiveFrameScheduler()  # Picks how often to run the model from measured latency
+    last_seq = -1
+    motion_gate = MotionGate(roi)
+    last_result = None
+    tracker = PieceTracker()  # Stable piece ids; boxes carried forward between model runs
+
+    async def capture():
+        """Acquisition stage: the newest frame of the camera, or END when the feed must stop."""
+        nonlocal last_seq
+        if stop_event.is_set():
+            return END
+        if not frame_source.camera_is_running:
+            logging.debug("Camera is not running.")
+            return END
+        if time.time() - detection_time > timeout_duration and not object_detected:
+            logging.debug("Timeout reached without object detection, stopping.")
+            return END
+
+        # Wait off the event loop for a frame newer than the last one we consumed
+        try:
+            frame, frame_info = await asyncio.to_thread(frame_source.read, last_seq, 5.0, True)
+        except SystemError:
+            # No new frame within the timeout, e.g. a triggered camera waiting for its next part:
+            # keep the previous sequence number and wait again instead of ending the feed
+            logging.debug("No frame captured.")
+            return None
+        last_seq = frame_info["seq"]
+        scheduler.observe_frame()
+
+        if not isinstance(frame, np.ndarray):
+            logging.error("Captured frame is not a NumPy array.")
+            return None
+        if frame.ndim != 3 or frame.dtype != np.uint8:
+            logging.error(f"Frame dimensions or data type are incorrect. Dimensions: {frame.ndim}, Data type: {frame.dtype}")
+            return None
+        return frame, frame_info
+
+    async def infer(captured):
+        """
+        Inference stage: when the scene changed, run the model if the tracks need a fresh detection and
+        the scheduler's interval has elapsed; otherwise carry the tracked boxes forward.
+        """
+        nonlocal last_result, detection_time, object_detected
+        frame, frame_info = captured
+        timestamp = frame_info.get("timestamp", time.time())
+
+        # When nothing moved the client already shows this result, so nothing is sent, unless the tracks
+        # still need the model (unconfirmed or drifting)
+        if not (motion_gate.changed(frame) or last_result is None or tracker.unsettled(timestamp)):
+            return None
+
+        # Process the newest frame once the scheduler's interval has elapsed
+        if last_result is None or (tracker.needs_detection(timestamp) and scheduler.should_process()):
+            started = time.time()
+            detections, _, _ = await process_frame(frame)
+            scheduler.record(timestamp, started)
+            # Only a frame the model ran on becomes the gate's reference, so a skipped change is reported again
+            motion_gate.accept(frame)
+            tracker.update(detections, timestamp)
+        tracked = tracker.predict(timestamp)
+        last_result = (tracked, len(tracked), 0)
+        detections, detected_target, non_target_count = last_result
+
+        if non_target_count > 0:
+            logging.error(f"Detected {non_target_count} pieces that do not belong.")
+
+        if detected_target:
+            object_detected = True
+            detection_time = time.time()
+
+        return frame, detections
+
+    def overlay_and_encode(frame, detections):
+        # One colour per class
+        processed_frame = draw_detections(frame, detections, class_colors(detections))
+        if processed_frame.shape[2] != 3:
+            logging.error("Processed frame is not in BGR format.")
+            return False, None
+        return cv2.imencode('.jpg', processed_frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
+
+    async def encode(inferred):
+        """Overlay/encode stage: draw and JPEG-encode off the event loop."""
+        success, buffer = await asyncio.to_thread(overlay_and_encode, *inferred)
+        if not success:
+            logging.error("Failed to encode frame.")
+            return None
+        return (b'--frame\r\n'
+                b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+
     try:
-        while not stop_event.is_set():
-            logging.debug("Stop event not set, continuing loop.")
-            if frame_source.camera_is_running:
-                logging.debug("Camera is running.")
-                frame = frame_source.frame()
-                if frame is None:
-                    logging.debug("No frame captured.")
-                    await asyncio.sleep(0)  # Yield control to the event loop
-                    continue
-
-                if frame_counter % process_interval == 0:
-                    if not isinstance(frame, np.ndarray):
-                        logging.error("Captured frame is not a NumPy array.")
-                        continue
-
-                    if frame.ndim != 3 or frame.dtype != np.uint8:
-                        logging.error(f"Frame dimensions or data type are incorrect. Dimensions: {frame.ndim}, Data type: {frame.dtype}")
-                        continue
-
-                    processed_frame, detected_target, non_target_count = await process_frame(frame)
-
-                    if non_target_count > 0:
-                        logging.error(f"Detected {non_target_count} pieces that do not belong.")
-                    
-                    if detected_target:
-                        object_detected = True
-                        detection_time = time.time()
-                    
-                    if processed_frame.shape[2] == 3:
-                        _, buffer = cv2.imencode('.jpg', processed_frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-                        if not _:
-                            logging.error("Failed to encode frame.")
-                            continue
-
-                        image_stream = io.BytesIO(buffer)
-                        yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + image_stream.getvalue() + b'\r\n')
-                    else:
-                        logging.error("Processed frame is not in BGR format.")
-                    
-                frame_counter += 1
-
-                if time.time() - detection_time > timeout_duration and not object_detected:
-                    logging.debug("Timeout reached without object detection, stopping.")
-                    break
-            else:
-                logging.debug("Camera is not running.")
-                break
-
-            await asyncio.sleep(0)  # Yield control to the event loop
+        # Each stage runs on its own task; the send stage is this generator, driven by the response
+        async for chunk in StreamPipeline(capture, [infer, encode], name="identify feed"):
+            yield chunk
 
     finally:
         logging.debug("Stopping frame source.")
         stop_training()
         stop_event.clear()  # Clear the event for the next use
-        frame_source.stop()
+        await asyncio.to_thread(camera_manager.release, camera_id)
         logging.debug("Stop event cleared.")
 
 
@@ -139,8 +179,12 @@ def stop_training():
         # Update the piece with the results
 
 @router.get("/video_identify_feed")
-async def video_identify_feed(camera_id: int, db: Session = Depends(get_db)):
-    return StreamingResponse(generate_frame(camera_id, db), media_type='multipart/x-mixed-replace; boundary=frame')
+async def video_identify_feed(camera_id: int, roi: Optional[str] = None, db: Session = Depends(get_db)):
+    try:
+        roi = parse_roi(roi)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(generate_frame(camera_id, db, roi), media_type='multipart/x-mixed-replace; boundary=frame')
 
 
 
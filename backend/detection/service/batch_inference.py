@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on frames per forward pass, and how long the first frame of a batch
+# may wait for others to join it.
+MAX_BATCH_SIZE = 8
+MAX_BATCH_WAIT = 0.010  # seconds
+
+
+def _settle(setter: Callable[[Any], None], value: Any):
+    """Resolve a caller's future, unless the caller went away (e.g. a viewer disconnected) and cancelled it."""
+    try:
+        setter(value)
+    except InvalidStateError:
+        pass
+
+
+class BatchInferenceEngine:
+    """
+    Collects frames submitted by several streams or cameras within a short time window,
+    runs them through the model as one batch and hands every caller its own result.
+
+    `run_batch(frames, contexts)` must return one result per frame, in order, or a Future of
+    that list when the batch runs elsewhere (e.g. the inference worker pool); in that case the
+    next batch is collected while the previous one is still running. `contexts` carries
+    whatever per-frame argument the model call needs (e.g. the target label).
+    """
+
+    def __init__(self, run_batch: Callable[[List[np.ndarray], List[Any]], List[Any]],
+                 max_batch_size: int = MAX_BATCH_SIZE, max_wait: float = MAX_BATCH_WAIT, name: str = "inference"):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"batch-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        # Frames still queued will never be batched: fail their callers instead of leaving them waiting
+        pending = []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait()[2])
+            except queue.Empty:
+                break
+        if pending:
+            self._fail(pending, RuntimeError(f"Batch engine '{self.name}' stopped"))
+
+    def submit(self, frame: np.ndarray, context: Any = None) -> Future:
+        """Queue one frame for the next batch; the returned future resolves to its result."""
+        if self._thread is None:
+            self.start()
+        future: Future = Future()
+        self._queue.put((frame, context, future))
+        return future
+
+    async def infer(self, frame: np.ndarray, context: Any = None) -> Any:
+        """Awaitable form of submit(), for use from the feed coroutines."""
+        return await asyncio.wrap_future(self.submit(frame, context))
+
+    def _collect_batch(self) -> List[tuple]:
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            frames = [frame for frame, _, _ in batch]
+            contexts = [context for _, context, _ in batch]
+            futures = [future for _, _, future in batch]
+            try:
+                results = self.run_batch(frames, contexts)
+            except Exception as e:
+                self._fail(futures, e)
+                continue
+
+            if isinstance(results, Future):
+                results.add_done_callback(lambda done, futures=futures: self._scatter(futures, done))
+                continue
+            try:
+                self._resolve(futures, results)
+            except Exception as e:
+                # A malformed result must not end the batch thread: submit() would never restart it
+                self._fail(futures, e)
+
+    def _scatter(self, futures: List[Future], done: Future):
+        try:
+            self._resolve(futures, done.result())
+        except Exception as e:
+            self._fail(futures, e)
+
+    def _resolve(self, futures: List[Future], results: List[Any]):
+        """Hand every caller its result; callers left without one (a short result list) are failed."""
+        for future, result in zip(futures, results):
+            _settle(future.set_result, result)
+        if len(results) < len(futures):
+            self._fail(futures[len(results):],
+                       RuntimeError(f"run_batch returned {len(results)} result(s) for {len(futures)} frame(s)"))
+
+    @staticmethod
+    def _fail(futures: List[Future], error: Exception):
+        logger.error(f"Batch inference failed for {len(futures)} frame(s): {error}")
+        for future in futures:
+            _settle(future.set_exception, error)
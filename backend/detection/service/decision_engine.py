@@ -0,0 +1,107 @@
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from detection.service.postprocessing import Detections
+
+# Processed frames the scores are averaged over
+DEFAULT_WINDOW = int(os.getenv("DECISION_WINDOW", "8"))
+# A class counts as present once its windowed score reaches ENTER_THRESHOLD, and absent again only below EXIT_THRESHOLD
+ENTER_THRESHOLD = float(os.getenv("DECISION_ENTER_THRESHOLD", "0.6"))
+EXIT_THRESHOLD = float(os.getenv("DECISION_EXIT_THRESHOLD", "0.35"))
+# Consecutive processed frames a verdict must survive before it is stable
+STABLE_FRAMES = 3
+# Seconds inference stays suspended once the verdict is stable, before it is checked again
+DEFAULT_HOLD = float(os.getenv("DECISION_HOLD", "5.0"))
+
+PENDING = "pending"
+PASS = "pass"
+FAIL = "fail"
+
+
+class DecisionEngine:
+    """
+    Turns per-frame detections into a debounced verdict for one piece position. Every processed frame
+    adds, for each class, its highest confidence in that frame to a sliding window; a class's score is
+    its average over the window, so a piece missed or mislabelled in one frame barely moves it.
+    Presence of the target and of foreign pieces switch with hysteresis (ENTER_THRESHOLD / EXIT_THRESHOLD)
+    and the verdict is PASS when the target is present and nothing else is, FAIL otherwise. Once the
+    verdict has held for STABLE_FRAMES frames, `should_infer()` is False for `hold` seconds, or until
+    `end_hold()` reports that the scene changed.
+    """
+
+    def __init__(self, target_label: str, window: int = DEFAULT_WINDOW, hold: float = DEFAULT_HOLD):
+        self.target_label = target_label
+        self.window = window
+        self.hold = hold
+        self.min_observations = max(1, window // 2)
+        self._frames: Deque[Dict[str, float]] = deque(maxlen=window)
+        self.target_present = False
+        self.foreign_present = False
+        self.verdict = PENDING
+        self._streak = 0
+        self._stable_since: Optional[float] = None
+
+    def scores(self) -> Dict[str, float]:
+        """Windowed score of every label seen in the window; frames without the label count as 0."""
+        totals: Dict[str, float] = {}
+        for frame in self._frames:
+            for label, confidence in frame.items():
+                totals[label] = totals.get(label, 0.0) + confidence
+        return {label: total / max(len(self._frames), 1) for label, total in totals.items()}
+
+    @staticmethod
+    def _hysteresis(present: bool, score: float) -> bool:
+        return score >= EXIT_THRESHOLD if present else score >= ENTER_THRESHOLD
+
+    def observe(self, detections: Detections, now: Optional[float] = None) -> str:
+        """Add the detections of one processed frame and return the verdict."""
+        frame: Dict[str, float] = {}
+        for label, confidence in zip(detections.labels(), detections.confidences.tolist()):
+            frame[label] = max(frame.get(label, 0.0), confidence)
+        self._frames.append(frame)
+
+        scores = self.scores()
+        self.target_present = self._hysteresis(self.target_present, scores.get(self.target_label, 0.0))
+        foreign_score = max((score for label, score in scores.items() if label != self.target_label), default=0.0)
+        self.foreign_present = self._hysteresis(self.foreign_present, foreign_score)
+
+        if len(self._frames) < self.min_observations:
+            verdict = PENDING
+        else:
+            verdict = PASS if self.target_present and not self.foreign_present else FAIL
+        self._streak = self._streak + 1 if verdict == self.verdict else 1
+        self.verdict = verdict
+        if self.stable and self._stable_since is None:
+            self._stable_since = now or time.time()
+        elif not self.stable:
+            self._stable_since = None
+        return verdict
+
+    @property
+    def stable(self) -> bool:
+        return self.verdict != PENDING and self._streak >= STABLE_FRAMES
+
+    def should_infer(self, now: Optional[float] = None) -> bool:
+        """False while a stable verdict is being held; the model runs again once the hold expires."""
+        if self._stable_since is None:
+            return True
+        if (now or time.time()) - self._stable_since >= self.hold:
+            # Re-check: the window is kept, so the verdict only changes if new frames contradict it
+            self._stable_since = None
+            self._streak = 0
+            return True
+        return False
+
+    def end_hold(self):
+        """The scene changed: run the model again now; the window is kept so the verdict moves only on new evidence."""
+        self._stable_since = None
+        self._streak = 0
+
+    def reset(self):
+        self._frames.clear()
+        self.target_present = self.foreign_present = False
+        self.verdict = PENDING
+        self._streak = 0
+        self._stable_since = None
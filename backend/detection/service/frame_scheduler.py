@@ -0,0 +1,68 @@
+import math
+import os
+import time
+from typing import Optional
+
+# End-to-end budget, from the moment a frame is grabbed to the moment its result is ready
+DEFAULT_TARGET_LATENCY = float(os.getenv("FEED_TARGET_LATENCY", "0.25"))  # seconds
+# Weight of the newest sample in the moving averages
+SMOOTHING = 0.2
+MAX_INTERVAL = 30  # frames
+
+
+class AdaptiveFrameScheduler:
+    """
+    Replaces a fixed "process every N frames" with an interval derived from measurements:
+    the camera frame rate and the inference latency of this feed. The model is never asked for
+    more than it can deliver (one frame per inference time), and when the end-to-end latency
+    goes over the target, e.g. because other feeds share the inference workers, the interval
+    grows until it is back under budget. Processing is time based, so whatever frame is the
+    newest when the interval has elapsed is the one that is processed.
+    """
+
+    def __init__(self, target_latency: float = DEFAULT_TARGET_LATENCY, max_interval: int = MAX_INTERVAL):
+        self.target_latency = target_latency
+        self.max_interval = max_interval
+        self.frame_period: Optional[float] = None
+        self.inference_latency: Optional[float] = None
+        self.end_to_end_latency: Optional[float] = None
+        self.interval = 1
+        self._last_frame_time: Optional[float] = None
+        self._last_processed_time: Optional[float] = None
+
+    @staticmethod
+    def _average(current: Optional[float], sample: float) -> float:
+        return sample if current is None else current + SMOOTHING * (sample - current)
+
+    def observe_frame(self, now: Optional[float] = None):
+        """Call once per frame read, to track the frame rate the feed actually receives."""
+        now = now or time.time()
+        if self._last_frame_time is not None and now > self._last_frame_time:
+            self.frame_period = self._average(self.frame_period, now - self._last_frame_time)
+        self._last_frame_time = now
+
+    def should_process(self, now: Optional[float] = None) -> bool:
+        """True when at least `interval` frame periods have passed since the last processed frame."""
+        now = now or time.time()
+        if self._last_processed_time is None or self.frame_period is None:
+            return True
+        # Half a period of slack so that jitter in the frame arrival does not skip an extra frame
+        return now - self._last_processed_time >= (self.interval - 0.5) * self.frame_period
+
+    def record(self, frame_timestamp: float, started: float, finished: Optional[float] = None):
+        """Record one processed frame: when it was grabbed, and when its inference started and finished."""
+        finished = finished or time.time()
+        self._last_processed_time = started
+        self.inference_latency = self._average(self.inference_latency, finished - started)
+        self.end_to_end_latency = self._average(self.end_to_end_latency, finished - frame_timestamp)
+        self.interval = self._compute_interval()
+
+    def _compute_interval(self) -> int:
+        if self.frame_period is None or self.inference_latency is None:
+            return 1
+        # Frames that arrive while one inference is running cannot be processed anyway
+        interval = self.inference_latency / self.frame_period
+        if self.end_to_end_latency > self.target_latency:
+            # Over budget: shed load in proportion to the overshoot
+            interval *= self.end_to_end_latency / self.target_latency
+        return max(1, min(self.max_interval, math.ceil(interval)))
@@ -1,112 +1,51 @@
-import cv2
-from fastapi import HTTPException
-from detection.service.model_service import load_my_model
-import torch
+from detection.service.inference_core import get_inference_core
+from detection.service.postprocessing import class_colors, draw_detections
 
 class IdentifySystem:
-    def __init__(self, confidence_threshold=0.5):
+    """Open identification: every piece the model recognises, whatever its label."""
+
+    def __init__(self, confidence_threshold=0.5, backend=None, model_scale=None):
         self.confidence_threshold = confidence_threshold
-        self.device = self.get_device()  # Get the device (CPU or GPU)
-        self.model = None   # Dictionary to hold models loaded by label
+        self.backend = backend
+        self.model_scale = model_scale
+        self.core = None  # Shared inference core, fetched on first use
         self.default_label = "all"  # Label for generic detection
 
-    def get_device(self):
-        """Check for GPU availability and return the appropriate device."""
-        if torch.cuda.is_available():
-            print("Using GPU")
-            return torch.device('cuda')
-        else:
-            print("Using CPU")
-            return torch.device('cpu')
-        
     def get_my_model(self):
-        """Load the YOLO model based on available device."""
-        
-        # If the model has already been loaded, return it
-        if self.model is not None:
-            return self.model
-
-        # Otherwise, try to load the model
-        self.model = load_my_model()
-
-        # If the model was not found, raise an HTTP exception
-        if self.model is None:
-            raise HTTPException(status_code=404, detail="Model not found.")
+        """The YOLO model loaded by the shared inference core; the same copy DetectionSystem uses."""
+        if self.core is None:
+            self.core = get_inference_core(self.backend, self.model_scale)
+        return self.core.model
 
-        # Move model to the appropriate device
-        self.model.to(self.device)
-
-        # Convert to half precision if using a GPU
-        if self.device.type == 'cuda':
-            self.model.half()  # Convert model to FP16
-
-        return self.model
+    def infer(self, frames):
+        """Letterbox the frames, run one forward pass and return per-frame results with boxes in frame coordinates."""
+        self.get_my_model()
+        return self.core.infer(frames)
 
+    def detect_batch(self, frames, _contexts=None):
+        """Run the model once on a batch of frames and return one Detections per frame, without drawing."""
+        self.get_my_model()
+        return self.core.detect_batch(frames, self.confidence_threshold)
 
     def detect_and_contour(self, frame):
-        # Retrieve the model (no specific label needed)
-        frame_tensor = torch.tensor(frame).permute(2, 0, 1).float().to(self.device)
-
-        # Normalize the tensor to the range [0.0, 1.0]
-        frame_tensor /= 255.0  # Normalize to [0, 1]
-
-        # Use half precision if using a GPU
-        frame_tensor = frame_tensor.half() if self.device.type == 'cuda' else frame_tensor
-
-        # Perform detection on the received frame
+        return self.detect_and_contour_batch([frame])[0]
+
+    def detect_and_contour_batch(self, frames, _contexts=None):
+        """
+        Run the model once on a batch of frames and annotate each frame.
+        Returns a list of (frame, detected_count), in the order of `frames`.
+        """
+        if not frames:
+            return []
         try:
-            results = self.model(frame_tensor.unsqueeze(0))[0]  # Add batch dimension
+            batch_detections = self.detect_batch(frames)
         except Exception as e:
             print(f"Detection failed: {e}")
-            return frame, False, 0  # Return the frame and zero non-target count
-
-        class_names = self.model.names  # Retrieve the list of class names
-        
-
-        # Define colors for different classes
-        color_map = [(0, 255, 0), (0, 0, 255), (255, 0, 0), (0, 255, 255), (255, 0, 255)]
-        
-        detected_count = 0  # Counter for detected pieces
-        
-        for box in results.boxes:
-            confidence = box.conf.item()
-            if confidence < self.confidence_threshold:
-                continue  # Skip this detection
-
-            # Extract the bounding box coordinates
-            xyxy = box.xyxy[0].cpu().numpy()
-            x1, y1, x2, y2 = map(int, xyxy)
-            
-            # Extract the class ID and corresponding label
-            class_id = int(box.cls.item())
-            detected_label = class_names[class_id]
-            
-            # Determine color based on class ID
-            color = color_map[class_id % len(color_map)]  # Cycle through the color map
-            
-            # Draw the bounding box with the determined color
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-            
-            # Add the class name and confidence score above the bounding box
-            label = f"{detected_label}: {confidence:.2f}"
-            label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
-# Calculate position for the label
-            label_y = y1 - 10  # Default position above the bounding box
-            if label_y < 0:  # If the label goes off the top of the frame
-                label_y = y2 + label_size[1] + 5  # Position below the bounding box
-            
-            # Ensure label does not exceed frame width
-            if x1 + label_size[0] > frame.shape[1]:  # If label exceeds right edge
-                label_x = x1 - label_size[0]
-            else:
-                label_x = x1  # Default to the left of the bounding box
+            return [(frame, 0) for frame in frames]  # Return the frames and zero detected pieces
 
-            # Draw a filled rectangle behind the text for better visibility
-            cv2.rectangle(frame, (label_x, label_y - label_size[1] - 5), 
-                          (label_x + label_size[0], label_y), (0, 0, 0), -1)
+        return [self.draw_results(frame, detections) for frame, detections in zip(frames, batch_detections)]
 
-            # Add the class name and confidence score
-            cv2.putText(frame, label, (label_x, label_y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-# Increment the count for detected pieces
-        
-        return frame, detected_count  # Return the frame and count of detected pieces
+    def draw_results(self, frame, detections):
+        """Draw one frame's detections, one colour per class, and count the detected pieces."""
+        draw_detections(frame, detections, class_colors(detections))
+        return frame, len(detections)  # Return the frame and count of detected pieces
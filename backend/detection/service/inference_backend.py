@@ -0,0 +1,112 @@
+import ast
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import torch
+import yaml
+from ultralytics.engine.results import Results
+from ultralytics.utils import ops
+
+try:
+    import onnxruntime
+except ImportError:  # Only needed for INFERENCE_BACKEND=onnx
+    onnxruntime = None
+
+try:
+    import openvino
+except ImportError:  # Only needed for INFERENCE_BACKEND=openvino
+    openvino = None
+
+
+# Same thresholds the ultralytics predictor uses; the per-feed confidence threshold is applied when drawing
+NMS_CONFIDENCE = 0.25
+NMS_IOU = 0.7
+
+
+def default_threads() -> int:
+    """INFERENCE_THREADS if set, otherwise the torch thread count (set per inference worker)."""
+    configured = os.getenv("INFERENCE_THREADS")
+    return max(1, int(configured)) if configured else torch.get_num_threads()
+
+
+class ExportedBackend:
+    """
+    Runs an exported YOLO graph with the same call convention as an ultralytics model:
+    `backend(batch)` takes the (n, 3, imgsz, imgsz) float tensor from the Preprocessor and
+    returns one Results per image, with boxes in model input coordinates.
+    """
+
+    names: Dict[int, str] = {}
+    imgsz: int = 640
+
+    def run(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def __call__(self, batch: torch.Tensor, verbose: bool = False) -> List[Results]:
+        output = self.run(np.ascontiguousarray(batch.cpu().numpy(), dtype=np.float32))
+        detections = ops.non_max_suppression(torch.from_numpy(output), NMS_CONFIDENCE, NMS_IOU)
+        shape = (self.imgsz, self.imgsz, 3)
+        return [Results(np.empty(shape, dtype=np.uint8), path="", names=self.names, boxes=boxes)
+                for boxes in detections]
+
+
+class OnnxBackend(ExportedBackend):
+    """ONNX Runtime session with an explicit intra-op thread count."""
+
+    def __init__(self, path: str, threads: int):
+        if onnxruntime is None:
+            raise RuntimeError("onnxruntime is not installed.")
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+        # ultralytics stores the class names and input size as model metadata
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata["names"])
+        imgsz = ast.literal_eval(metadata.get("imgsz", "[640, 640]"))
+        self.imgsz = int(max(imgsz)) if isinstance(imgsz, (list, tuple)) else int(imgsz)
+
+    def run(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVINOBackend(ExportedBackend):
+    """OpenVINO IR compiled for the CPU, with a fixed input size and a dynamic batch dimension."""
+
+    def __init__(self, model_dir: str, threads: int):
+        if openvino is None:
+            raise RuntimeError("openvino is not installed.")
+        with open(os.path.join(model_dir, "metadata.yaml"), "r") as f:
+            metadata = yaml.safe_load(f)
+        self.names = metadata["names"]
+        imgsz = metadata.get("imgsz", [640, 640])
+        self.imgsz = int(max(imgsz)) if isinstance(imgsz, (list, tuple)) else int(imgsz)
+
+        xml = next(name for name in os.listdir(model_dir) if name.endswith(".xml"))
+        core = openvino.Core()
+        model = core.read_model(os.path.join(model_dir, xml))
+        model.reshape({0: openvino.PartialShape([-1, 3, self.imgsz, self.imgsz])})
+        self.compiled = core.compile_model(model, "CPU", {
+            "INFERENCE_NUM_THREADS": threads,
+            "PERFORMANCE_HINT": "LATENCY",
+        })
+        self.request = self.compiled.create_infer_request()
+
+    def run(self, batch: np.ndarray) -> np.ndarray:
+        self.request.infer({0: batch})
+        return self.request.get_output_tensor(0).data.copy()
+
+
+def load_backend(backend: str, path: str, threads: Optional[int] = None) -> ExportedBackend:
+    """Open the exported model at `path` for `backend` ("onnx", "openvino" or their _int8 variants)."""
+    threads = threads or default_threads()
+    if backend in ("onnx", "onnx_int8"):
+        return OnnxBackend(path, threads)
+    if backend in ("openvino", "openvino_int8"):
+        return OpenVINOBackend(path, threads)
+    raise ValueError(f"No exported backend named {backend}")
@@ -0,0 +1,101 @@
+import os
+import threading
+from typing import Dict, List, Optional
+
+import torch
+from fastapi import HTTPException
+
+from detection.service.inference_backend import load_backend
+from detection.service.model_service import (
+    default_backend, default_model_scale, get_inference_model_path, load_my_model
+)
+from detection.service.postprocessing import Detections, extract_detections
+from detection.service.preprocessing import Preprocessor, model_imgsz, scale_boxes
+
+
+class InferenceCore:
+    """
+    One loaded model and everything needed to run it: device selection, the letterbox preprocessor,
+    batched forward passes and conversion of the results to Detections. What the detections mean
+    (target verification, open identification) is left to the systems built on top of it.
+    """
+
+    def __init__(self, backend: str, model_scale: str):
+        # "torch" runs the .pt model; "onnx"/"openvino" run the exported graph on the CPU
+        self.backend = backend
+        # Size tier (n/s/m/l/x) of the model this deployment serves
+        self.model_scale = model_scale
+        self.device = self.get_device() if self.backend == "torch" else torch.device('cpu')
+        self.model = self.load_model()
+        # Reused letterbox/normalise buffers at the size the model was trained at
+        self.preprocessor = Preprocessor(model_imgsz(self.model), self.device, half=self.device.type == 'cuda')
+        # The preprocessor buffers are reused, so one batch runs at a time
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_device():
+        """Check for GPU availability and return the appropriate device."""
+        if torch.cuda.is_available():
+            print("Using GPU")
+            return torch.device('cuda')
+        else:
+            print("Using CPU")
+            return torch.device('cpu')
+
+    def load_model(self):
+        """Load the YOLO model (or the exported graph) based on the backend and the available device."""
+        if self.backend != "torch":
+            model_path = get_inference_model_path(self.backend, self.model_scale)
+            if not os.path.exists(model_path):
+                raise HTTPException(status_code=404, detail=f"Exported {self.backend} model not found, export it first.")
+            return load_backend(self.backend, model_path)
+
+        model = load_my_model(self.model_scale)
+        if model is None:
+            raise HTTPException(status_code=404, detail="Model not found.")
+
+        # Move model to the appropriate device
+        model.to(self.device)
+
+        # Convert to half precision if using a GPU
+        if self.device.type == 'cuda':
+            model.half()  # Convert model to FP16
+
+        return model
+
+    @property
+    def names(self) -> Dict[int, str]:
+        return self.model.names
+
+    def infer(self, frames):
+        """Letterbox the frames, run one forward pass and return per-frame results with boxes in frame coordinates."""
+        with self._lock:
+            batch, metas = self.preprocessor(frames)
+            with torch.inference_mode():
+                batch_results = self.model(batch, verbose=False)
+                for results, meta in zip(batch_results, metas):
+                    scale_boxes(results.boxes.data, meta)
+        return batch_results
+
+    def detect_batch(self, frames, confidence_threshold: float) -> List[Detections]:
+        """Run the model once on a batch of frames and return one Detections per frame."""
+        if not frames:
+            return []
+        return extract_detections(self.infer(frames), self.names, confidence_threshold)
+
+
+_cores: Dict[str, InferenceCore] = {}
+_cores_lock = threading.Lock()
+
+
+def get_inference_core(backend: Optional[str] = None, model_scale: Optional[str] = None) -> InferenceCore:
+    """The process-wide core for a weights file: every system using the same model shares one copy of it."""
+    backend = backend or default_backend()
+    model_scale = model_scale or default_model_scale()
+    key = os.path.abspath(get_inference_model_path(backend, model_scale))
+    with _cores_lock:
+        core = _cores.get(key)
+        if core is None:
+            core = InferenceCore(backend, model_scale)
+            _cores[key] = core
+        return core
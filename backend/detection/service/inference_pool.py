@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Intra-op threads given to torch in each worker; the default worker count divides the cores by this
+THREADS_PER_WORKER = 4
+
+
+def default_worker_count() -> int:
+    """INFERENCE_WORKERS if set, otherwise one worker per THREADS_PER_WORKER cores."""
+    configured = os.getenv("INFERENCE_WORKERS")
+    if configured:
+        return max(1, int(configured))
+    return max(1, (os.cpu_count() or 1) // THREADS_PER_WORKER)
+
+
+# --- Worker process side -------------------------------------------------------------------
+
+_worker_systems: Dict[str, Any] = {}
+_worker_segments: Dict[str, shared_memory.SharedMemory] = {}
+MAX_CACHED_SEGMENTS = 64
+
+
+def _init_worker(threads: int):
+    import cv2
+    import torch
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(1)
+
+
+def _get_system(kind: str):
+    """Load the model for `kind` the first time this worker sees it."""
+    system = _worker_systems.get(kind)
+    if system is None:
+        if kind == "detection":
+            from detection.service.detection_service import DetectionSystem
+            system = DetectionSystem()
+        elif kind == "identify":
+            from detection.service.identifiying_service import IdentifySystem
+            system = IdentifySystem()
+            system.get_my_model()
+        else:
+            raise ValueError(f"Unknown inference kind: {kind}")
+        _worker_systems[kind] = system
+    return system
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    segment = _worker_segments.get(name)
+    if segment is None:
+        if len(_worker_segments) >= MAX_CACHED_SEGMENTS:
+            # Slots replaced by the parent leave stale handles behind
+            for stale in _worker_segments.values():
+                stale.close()
+            _worker_segments.clear()
+        segment = shared_memory.SharedMemory(name=name)
+        _worker_segments[name] = segment
+    return segment
+
+
+def _run_batch(kind: str, handles: List[Tuple[str, tuple, str]], contexts: List[Any], draw: bool = True) -> List[Any]:
+    """
+    Runs in a worker: view the frames in shared memory and run one batch.
+    With `draw`, the frames are annotated in place and everything but the frame is returned for each
+    result; without it only the per-frame Detections are returned and the frames are left untouched.
+    Either way only small objects cross the process boundary.
+    """
+    frames = [np.ndarray(shape, dtype=np.dtype(dtype), buffer=_attach(name).buf) for name, shape, dtype in handles]
+    if not draw:
+        return _get_system(kind).detect_batch(frames)
+
+    results = _get_system(kind).detect_and_contour_batch(frames, contexts)
+    tails = []
+    for view, result in zip(frames, results):
+        frame = result[0]
+        if frame is not view and frame.shape == view.shape:
+            view[...] = frame
+        tails.append(tuple(result[1:]))
+    return tails
+
+
+# --- API server side -----------------------------------------------------------------------
+
+class InferencePool:
+    """
+    Runs the detection models in a pool of worker processes so that forward passes never block
+    the event loop. Frames are copied once into reusable shared-memory slots; the worker either
+    annotates them in place or leaves them alone, and only counts or Detections are pickled back.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or default_worker_count()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._free_slots: List[shared_memory.SharedMemory] = []
+        self._all_slots: List[shared_memory.SharedMemory] = []
+
+    def start(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is not None:
+                return self._executor
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            # spawn: the workers must not inherit the parent's threads, CUDA context or camera handles
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(threads,)
+            )
+            logger.info(f"Started {self.workers} inference worker(s) with {threads} thread(s) each.")
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        """
+        A worker died (crash, OOM kill) and the pool is broken: drop it so the next dispatch
+        starts a fresh one. Only the broken pool is dropped, never one another batch already recreated.
+        """
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        logger.error("An inference worker died; the worker pool will be restarted on the next batch.")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+            for slot in self._all_slots:
+                slot.close()
+                slot.unlink()
+            self._all_slots = []
+            self._free_slots = []
+
+    def _acquire_slot(self, nbytes: int) -> shared_memory.SharedMemory:
+        with self._lock:
+            fitting = [slot for slot in self._free_slots if slot.size >= nbytes]
+            if fitting:
+                slot = min(fitting, key=lambda s: s.size)
+                self._free_slots.remove(slot)
+                return slot
+            slot = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._all_slots.append(slot)
+            return slot
+
+    def _release_slots(self, slots: List[shared_memory.SharedMemory]):
+        with self._lock:
+            self._free_slots.extend(slot for slot in slots if slot in self._all_slots)
+
+    def dispatch(self, kind: str, frames: List[np.ndarray], contexts: Optional[List[Any]] = None,
+                 draw: bool = True) -> Future:
+        """
+        Send one batch to a worker. The returned future resolves to the same list the in-process
+        `detect_and_contour_batch` would return, with the annotated frames copied out of shared memory,
+        or with `draw=False` to the list `detect_batch` returns (one Detections per frame).
+        """
+        executor = self.start()
+        if contexts is None:
+            contexts = [None] * len(frames)
+
+        slots, handles = [], []
+        for frame in frames:
+            frame = np.ascontiguousarray(frame)
+            slot = self._acquire_slot(frame.nbytes)
+            slots.append(slot)
+            np.ndarray(frame.shape, dtype=frame.dtype, buffer=slot.buf)[...] = frame
+            handles.append((slot.name, frame.shape, frame.dtype.str))
+
+        try:
+            worker_future = executor.submit(_run_batch, kind, handles, list(contexts), draw)
+        except Exception as e:
+            self._release_slots(slots)
+            if isinstance(e, BrokenProcessPool):
+                self._discard(executor)
+            raise
+
+        result_future: Future = Future()
+
+        def _collect(done: Future):
+            try:
+                if not draw:
+                    result_future.set_result(done.result())
+                    return
+                results = []
+                for slot, (_, shape, dtype), tail in zip(slots, handles, done.result()):
+                    frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=slot.buf).copy()
+                    results.append((frame,) + tail)
+                result_future.set_result(results)
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    self._discard(executor)
+                result_future.set_exception(e)
+            finally:
+                self._release_slots(slots)
+
+        worker_future.add_done_callback(_collect)
+        return result_future
+
+    async def submit(self, kind: str, frames: List[np.ndarray], contexts: Optional[List[Any]] = None,
+                     draw: bool = True) -> List[Any]:
+        """Awaitable form of dispatch()."""
+        return await asyncio.wrap_future(self.dispatch(kind, frames, contexts, draw))
+
+
+inference_pool = InferencePool()
@@ -32,16 +32,32 @@ def load_model(piece_label: str):
 
 
  #tthis is the final correct laod model 
-def load_my_model():
+# YOLOv8 sizes, smallest to largest; "x" is what the models were originally trained at
+MODEL_SCALES = ("n", "s", "m", "l", "x")
+
+
+def default_model_scale():
+    """Model size tier this deployment serves, from MODEL_SCALE (x by default)."""
+    scale = os.getenv("MODEL_SCALE", "x").lower()
+    if scale not in MODEL_SCALES:
+        raise ValueError(f"MODEL_SCALE must be one of {MODEL_SCALES}, got {scale}")
+    return scale
+
+
+def get_my_model_path(scale: str = None):
+    """Path of the generic detection model shared by the detection and identify feeds, for one size tier."""
+    scale = scale or default_model_scale()
     # Get the directory of the script being executed
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    
+
     # Adjust the model directory path
     model_dir = os.path.join(script_dir, '..', 'models')
-    model_path = os.path.join(model_dir, 'yolo8x_model.pt')
+    return os.path.join(model_dir, f'yolo8{scale}_model.pt')
+
+
+def load_my_model(scale: str = None):
+    model_path = get_my_model_path(scale)
 
-    print(f"Script directory: {script_dir}")
-    print(f"Model directory: {model_dir}")
     print(f"Model path: {model_path}")
 
     # Check if the model file exists
@@ -53,4 +69,73 @@ def load_my_model():
     my_path_model = YOLO(model_path)
 
     print("Model loaded successfully.")
-    return my_path_model
\ No newline at end of file
+    return my_path_model
+
+BACKENDS = ("torch", "onnx", "openvino", "onnx_int8", "openvino_int8")
+
+
+def default_backend():
+    """Inference backend selected with INFERENCE_BACKEND: torch (default), onnx, openvino or their _int8 variants."""
+    backend = os.getenv("INFERENCE_BACKEND", "torch").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"INFERENCE_BACKEND must be one of {BACKENDS}, got {backend}")
+    return backend
+
+
+def get_inference_model_path(backend: str, scale: str = None):
+    """The file (or OpenVINO directory) `backend` loads the generic model from."""
+    return get_my_model_path(scale) if backend == "torch" else get_exported_model_path(backend, scale)
+
+
+# Where ultralytics writes each export format, relative to the .pt file
+EXPORT_SUFFIXES = {
+    "onnx": ".onnx",
+    "openvino": "_openvino_model",
+    # Written by quantization_service
+    "onnx_int8": "_int8.onnx",
+    "openvino_int8": "_int8_openvino_model",
+}
+
+
+def get_exported_model_path(backend: str, scale: str = None):
+    """Path of the exported generic model for `backend` ("onnx" file or "openvino" directory)."""
+    if backend not in EXPORT_SUFFIXES:
+        raise ValueError(f"Unsupported export format: {backend}")
+    return os.path.splitext(get_my_model_path(scale))[0] + EXPORT_SUFFIXES[backend]
+
+
+def export_model(backend: str = "onnx", imgsz: int = None, scale: str = None):
+    """
+    Export the generic model for CPU inference at a fixed input size (the training imgsz by default).
+    Both keep a dynamic batch axis so that batched frames can be fed to them: the ONNX
+    graph is exported dynamic and then pinned to imgsz, the OpenVINO model is reshaped on load.
+    """
+    from detection.service.preprocessing import model_imgsz
+
+    if backend not in ("onnx", "openvino"):
+        raise ValueError(f"Unsupported export format: {backend}")
+
+    model = load_my_model(scale)
+    if model is None:
+        raise FileNotFoundError(f"Model file not found at: {get_my_model_path(scale)}")
+
+    imgsz = imgsz or model_imgsz(model)
+    if backend == "onnx":
+        exported = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        _fix_onnx_input_size(exported, imgsz)
+    else:
+        exported = model.export(format="openvino", imgsz=imgsz, half=False)
+
+    print(f"Model exported to {exported} ({backend}, imgsz={imgsz}).")
+    return exported
+
+
+def _fix_onnx_input_size(path: str, imgsz: int):
+    """Pin the spatial input dimensions of an ONNX graph, leaving only the batch axis dynamic."""
+    import onnx
+
+    graph = onnx.load(path)
+    dims = graph.graph.input[0].type.tensor_type.shape.dim
+    dims[2].dim_value = imgsz
+    dims[3].dim_value = imgsz
+    onnx.save(graph, path)
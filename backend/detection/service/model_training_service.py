@@ -13,6 +13,7 @@ import matplotlib.pyplot as plt
 from database.piece.piece_image import PieceImage
 from services.piece_service import get_piece_labels_by_group, rotate_and_update_images
 from database.piece.piece import Piece
+from detection.service.model_service import MODEL_SCALES, get_my_model_path, load_my_model
 from torch.optim.lr_scheduler import ReduceLROnPlateau
 # Set up logging
 logging.basicConfig(level=logging.INFO,
@@ -134,8 +135,12 @@ def add_background_images(data_yaml_path):
 import torch
 from torch.optim import AdamW  # Import the AdamW optimizer
 
-def train_model(piece_label: str, db: Session):
+def train_model(piece_label: str, db: Session, model_scale: str = "x"):
+    """Fine-tune the generic model of size tier `model_scale` (n/s/m/l/x) on the images of one piece."""
     model = None
+    if model_scale not in MODEL_SCALES:
+        logger.error(f"Unknown model scale '{model_scale}', expected one of {MODEL_SCALES}.")
+        return
     try:
         # Set service directory
         service_dir = os.path.dirname(os.path.abspath(__file__))
@@ -186,7 +191,7 @@ def train_model(piece_label: str, db: Session):
         data_yaml_path = os.path.join(piece_data_dir, "data.yaml")
 
 
-        model_save_path = os.path.join(service_dir, '..', '..', 'detection', 'models', f"yolo8x_model.pt")
+        model_save_path = os.path.join(service_dir, '..', '..', 'detection', 'models', f"yolo8{model_scale}_model.pt")
         logger.info(f"Resolved data.yaml path: {data_yaml_path}")
         logger.info(f"Model save path: {model_save_path}")
 
@@ -210,7 +215,7 @@ def train_model(piece_label: str, db: Session):
             model = YOLO(model_save_path)  # Load the pre-trained model for fine-tuning
         else:
             logger.info("No pre-existing model found. Starting training from scratch.")
-            model = YOLO("yolov8x.pt")  # Load a base YOLO model
+            model = YOLO(f"yolov8{model_scale}.pt")  # Load a base YOLO model of the requested size
 
         model.to(device)
         batch_size = adjust_batch_size(device)
@@ -319,3 +324,128 @@ def train_model(piece_label: str, db: Session):
             torch.cuda.empty_cache()
         logger.info("Fine-tuning process finished.")
 
+
+
+
+# Teacher predictions below this confidence are not used as pseudo-labels
+DISTILL_CONFIDENCE = 0.5
+DISTILL_EPOCHS = 50
+
+
+def _resolve_split_dir(data, data_yaml_path, split):
+    split_dir = data[split]
+    if os.path.isabs(split_dir):
+        return split_dir
+    return os.path.normpath(os.path.join(data.get("path") or os.path.dirname(data_yaml_path), split_dir))
+
+
+def write_pseudo_labels(teacher, image_root, label_root, imgsz, batch_size=16):
+    """Label every image under `image_root` with the teacher's detections, mirroring the tree under `label_root`."""
+    image_paths = []
+    for root, _, files in os.walk(image_root):
+        image_paths.extend(os.path.join(root, name) for name in sorted(files)
+                           if name.lower().endswith((".jpg", ".jpeg", ".png", ".bmp")))
+
+    labelled = 0
+    for start in range(0, len(image_paths), batch_size):
+        if stop_event.is_set():
+            break
+        chunk = image_paths[start:start + batch_size]
+        for image_path, results in zip(chunk, teacher.predict(chunk, conf=DISTILL_CONFIDENCE, imgsz=imgsz, verbose=False)):
+            relative = os.path.relpath(image_path, image_root)
+            label_path = os.path.join(label_root, os.path.splitext(relative)[0] + ".txt")
+            os.makedirs(os.path.dirname(label_path), exist_ok=True)
+            with open(label_path, "w") as label_file:
+                for class_id, (x, y, w, h) in zip(results.boxes.cls.tolist(), results.boxes.xywhn.tolist()):
+                    label_file.write(f"{int(class_id)} {x} {y} {w} {h}\n")
+            labelled += 1
+    return labelled
+
+
+def distill_model(model_scale: str = "s", teacher_scale: str = "x"):
+    """
+    Train a small student model from the existing large one. The teacher labels the training images
+    (pseudo-label distillation), the student is trained on those labels from the pretrained
+    yolov8<scale>.pt weights and validated on the real validation labels.
+    """
+    student = None
+    if model_scale not in MODEL_SCALES or teacher_scale not in MODEL_SCALES:
+        logger.error(f"Model scales must be one of {MODEL_SCALES}.")
+        return
+    if MODEL_SCALES.index(model_scale) >= MODEL_SCALES.index(teacher_scale):
+        logger.error(f"The student ({model_scale}) must be smaller than the teacher ({teacher_scale}).")
+        return
+
+    try:
+        service_dir = os.path.dirname(os.path.abspath(__file__))
+        data_yaml_path = os.path.join(service_dir, "..", "..", "dataset_custom", "data.yaml")
+        distill_dir = os.path.join(service_dir, "..", "..", "dataset_distill")
+        student_save_path = get_my_model_path(model_scale)
+
+        teacher = load_my_model(teacher_scale)
+        if teacher is None:
+            logger.error(f"Teacher model not found at {get_my_model_path(teacher_scale)}. Train it first.")
+            return
+        if not os.path.isfile(data_yaml_path):
+            logger.error(f"data.yaml file not found at {data_yaml_path}")
+            return
+
+        with open(data_yaml_path, 'r') as f:
+            data = yaml.safe_load(f)
+
+        device = select_device()
+        teacher.to(device)
+        imgsz = 640
+
+        # Pseudo-labels from the teacher for the training split; images are copied so labels sit beside them
+        train_images = _resolve_split_dir(data, data_yaml_path, "train")
+        distill_images = os.path.join(distill_dir, "images", "train")
+        distill_labels = os.path.join(distill_dir, "labels", "train")
+        shutil.rmtree(distill_dir, ignore_errors=True)
+        shutil.copytree(train_images, distill_images)
+        labelled = write_pseudo_labels(teacher, distill_images, distill_labels, imgsz)
+        logger.info(f"Teacher yolo8{teacher_scale} labelled {labelled} training images for distillation.")
+        del teacher
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+        distill_yaml_path = os.path.join(distill_dir, "data.yaml")
+        with open(distill_yaml_path, 'w') as f:
+            yaml.safe_dump({
+                "train": os.path.abspath(distill_images),
+                "val": os.path.abspath(_resolve_split_dir(data, data_yaml_path, "val")),
+                "nc": len(data["names"]),
+                "names": data["names"],
+            }, f)
+
+        student = YOLO(f"yolov8{model_scale}.pt")
+
+        def check_stop(trainer):
+            if stop_event.is_set():
+                logger.info("Stop event detected. Ending distillation.")
+                trainer.stop = True
+
+        student.add_callback("on_train_epoch_end", check_stop)
+        logger.info(f"Distilling yolo8{teacher_scale} into yolo8{model_scale} on {device}.")
+        student.train(
+            data=distill_yaml_path,
+            epochs=DISTILL_EPOCHS,
+            imgsz=imgsz,
+            batch=adjust_batch_size(device),
+            device=device,
+            project=os.path.dirname(student_save_path),
+            name=f"distill_{model_scale}",
+            exist_ok=True,
+            amp=True,
+            patience=10,
+        )
+        student.save(student_save_path)
+        logger.info(f"Distilled model saved to {student_save_path}")
+
+    except Exception as e:
+        logger.error(f"An error occurred during distillation: {e}")
+    finally:
+        stop_event.clear()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        logger.info("Distillation process finished.")
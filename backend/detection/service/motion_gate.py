@@ -0,0 +1,115 @@
+import logging
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Pixels whose grey level moves by more than this count as changed
+DIFF_THRESHOLD = 25
+# Fraction of the ROI that must change before the model runs again
+MIN_CHANGED_FRACTION = 0.005
+# The comparison runs on a downscaled copy of the ROI; this is the width it is scaled to
+GATE_WIDTH = 160
+# Run the model anyway after this many seconds without change, so a stale result cannot linger
+REFRESH_INTERVAL = 10.0
+
+
+def parse_roi(roi: Optional[str]) -> Optional[Tuple[int, int, int, int]]:
+    """Parse an "x,y,width,height" query value (pixels) into a tuple; None or "" means the whole frame."""
+    if not roi:
+        return None
+    try:
+        x, y, width, height = (int(value) for value in roi.split(","))
+    except ValueError:
+        raise ValueError("roi must be four integers: x,y,width,height")
+    if width <= 0 or height <= 0 or x < 0 or y < 0:
+        raise ValueError("roi must have a non-negative origin and a positive size")
+    return x, y, width, height
+
+
+def clip_roi(frame: np.ndarray, roi: Tuple[int, int, int, int]) -> Optional[np.ndarray]:
+    """The part of `frame` inside `roi`, clipped to the frame, or None when they do not overlap."""
+    x, y, width, height = roi
+    frame_height, frame_width = frame.shape[:2]
+    x1, y1 = min(x, frame_width), min(y, frame_height)
+    x2, y2 = min(x + width, frame_width), min(y + height, frame_height)
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return frame[y1:y2, x1:x2]
+
+
+class MotionGate:
+    """
+    Cheap check run before the model: the frame is cropped to the ROI, reduced to a small blurred
+    grey image and compared with the last image the model ran on. `changed()` is True only when
+    enough of the ROI differs, so an idle cell between parts does not run inference at all.
+    `changed()` never moves the reference: the caller passes the frame to `accept()` once the model
+    has actually run on it, so a change the model skipped (scheduler, held verdict) is still reported.
+    """
+
+    def __init__(self, roi: Optional[Tuple[int, int, int, int]] = None, threshold: int = DIFF_THRESHOLD,
+                 min_changed_fraction: float = MIN_CHANGED_FRACTION, refresh_interval: float = REFRESH_INTERVAL):
+        self.roi = roi
+        self.threshold = threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.refresh_interval = refresh_interval
+        self._reference: Optional[np.ndarray] = None
+        self._roi_warned = False
+        # True when the last True from changed() was only the periodic refresh, not a detected change
+        self.refreshed = False
+        self._reference_time = 0.0
+        # Signature of the last frame passed to changed(), reused by accept()
+        self._checked: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def _signature(self, frame: np.ndarray) -> np.ndarray:
+        if self.roi is not None:
+            cropped = clip_roi(frame, self.roi)
+            if cropped is None:
+                if not self._roi_warned:
+                    logger.error(f"ROI {self.roi} lies outside the {frame.shape[1]}x{frame.shape[0]} frame; "
+                                 f"watching the whole frame instead.")
+                    self._roi_warned = True
+            else:
+                frame = cropped
+        scale = min(1.0, GATE_WIDTH / max(1, frame.shape[1]))
+        small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else frame
+        grey = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(grey, (5, 5), 0)
+
+    def changed(self, frame: np.ndarray) -> bool:
+        """True when the model should run on `frame`; the reference is left alone until `accept()`."""
+        signature = self._signature(frame)
+        self._checked = (frame, signature)
+        self.refreshed = False
+        if self._reference is None or self._reference.shape != signature.shape:
+            return True
+
+        diff = cv2.absdiff(signature, self._reference)
+        _, mask = cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY)
+        if cv2.countNonZero(mask) >= self.min_changed_fraction * mask.size:
+            return True
+
+        now = time.monotonic()
+        if now - self._reference_time > self.refresh_interval:
+            # Nothing moved, so the reference stays valid; only the refresh timer restarts
+            self._reference_time = now
+            self.refreshed = True
+            return True
+        # Compare with the last processed image, not the previous frame, so slow drifts still add up
+        return False
+
+    def accept(self, frame: np.ndarray):
+        """The model ran on `frame`: it becomes the image later frames are compared with."""
+        if self._checked is not None and self._checked[0] is frame:
+            signature = self._checked[1]
+        else:
+            signature = self._signature(frame)
+        self._reference, self._reference_time = signature, time.monotonic()
+        self._checked = None
+
+    def reset(self):
+        self._reference = None
+        self._checked = None
@@ -0,0 +1,114 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 0.5
+FONT_THICKNESS = 2
+
+TARGET_COLOR = (0, 255, 0)  # Green
+OTHER_COLOR = (0, 0, 255)  # Red
+CLASS_COLORS = np.array([(0, 255, 0), (0, 0, 255), (255, 0, 0), (0, 255, 255), (255, 0, 255)], dtype=np.uint8)
+
+
+@dataclass
+class Detections:
+    """The detections of one frame as flat arrays, in frame coordinates, already filtered by confidence."""
+
+    boxes: np.ndarray  # (n, 4) float32, x1 y1 x2 y2
+    confidences: np.ndarray  # (n,) float32
+    class_ids: np.ndarray  # (n,) int64
+    names: Dict[int, str] = field(default_factory=dict)
+    track_ids: Optional[np.ndarray] = None  # (n,) int64, set when the detections come from the tracker
+
+    def __len__(self) -> int:
+        return len(self.class_ids)
+
+    @classmethod
+    def empty(cls, names: Dict[int, str] = None) -> "Detections":
+        return cls(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64), names or {})
+
+    def labels(self) -> List[str]:
+        return [self.names[class_id] for class_id in self.class_ids.tolist()]
+
+    def class_mask(self, label: str) -> np.ndarray:
+        """Boolean mask of the detections whose class name is `label`."""
+        class_ids = [class_id for class_id, name in self.names.items() if name == label]
+        return np.isin(self.class_ids, class_ids)
+
+
+def extract_detections(batch_results, names: Dict[int, str], confidence_threshold: float) -> List[Detections]:
+    """
+    Convert the ultralytics results of a batch to Detections. The boxes of every frame are moved
+    to the host in a single transfer and filtered with array operations instead of box by box.
+    """
+    datas = [results.boxes.data for results in batch_results]
+    if not datas:
+        return []
+    counts = [len(data) for data in datas]
+    merged = torch.cat(datas).float().cpu().numpy() if sum(counts) else np.zeros((0, 6), np.float32)
+
+    detections = []
+    for data in np.split(merged, np.cumsum(counts)[:-1]):
+        data = data[data[:, 4] >= confidence_threshold]
+        detections.append(Detections(
+            boxes=data[:, :4].astype(np.float32),
+            confidences=data[:, 4].astype(np.float32),
+            class_ids=data[:, 5].astype(np.int64),
+            names=names,
+        ))
+    return detections
+
+
+def count_targets(detections: Detections, target_label: str) -> Tuple[bool, int]:
+    """Whether the target piece is present, and how many pieces that should not be passing are."""
+    is_target = detections.class_mask(target_label)
+    return bool(is_target.any()), int((~is_target).sum())
+
+
+def target_colors(detections: Detections, target_label: str) -> np.ndarray:
+    """Green for the target label, red for every other piece."""
+    return np.where(detections.class_mask(target_label)[:, None], TARGET_COLOR, OTHER_COLOR).astype(np.uint8)
+
+
+def class_colors(detections: Detections) -> np.ndarray:
+    """One colour per class, cycling through CLASS_COLORS."""
+    return CLASS_COLORS[detections.class_ids % len(CLASS_COLORS)]
+
+
+@lru_cache(maxsize=1024)
+def _text_size(label: str) -> Tuple[int, int]:
+    return cv2.getTextSize(label, FONT, FONT_SCALE, FONT_THICKNESS)[0]
+
+
+def draw_detections(frame: np.ndarray, detections: Detections, colors: Sequence) -> np.ndarray:
+    """Draw the boxes and their "label: confidence" tags on `frame` in place, and return it."""
+    if not len(detections):
+        return frame
+
+    width = frame.shape[1]
+    boxes = detections.boxes.astype(np.int32)
+    labels = [f"{name}: {confidence:.2f}" for name, confidence in zip(detections.labels(), detections.confidences.tolist())]
+    if detections.track_ids is not None:
+        labels = [f"#{track_id} {label}" for track_id, label in zip(detections.track_ids.tolist(), labels)]
+    colors = np.asarray(colors).tolist()
+
+    for (x1, y1, x2, y2), label, color in zip(boxes.tolist(), labels, colors):
+        # Draw the bounding box with the determined color
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+
+        label_width, label_height = _text_size(label)
+        label_y = y1 - 10  # Default position above the bounding box
+        if label_y < 0:  # If the label goes off the top of the frame
+            label_y = y2 + label_height + 5  # Position below the bounding box
+        # Ensure label does not exceed frame width
+        label_x = x1 - label_width if x1 + label_width > width else x1
+
+        # Draw a filled rectangle behind the text for better visibility
+        cv2.rectangle(frame, (label_x, label_y - label_height - 5), (label_x + label_width, label_y), (0, 0, 0), -1)
+        cv2.putText(frame, label, (label_x, label_y - 5), FONT, FONT_SCALE, (255, 255, 255), FONT_THICKNESS)
+    return frame
@@ -0,0 +1,86 @@
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+# Padding value used by YOLO letterboxing during training
+LETTERBOX_COLOR = 114
+DEFAULT_IMGSZ = 640
+
+
+def model_imgsz(model) -> int:
+    """The input size the model was trained at, from the arguments stored in its checkpoint."""
+    if isinstance(getattr(model, "imgsz", None), int):
+        return model.imgsz  # Exported backends know their fixed input size
+    args = getattr(getattr(model, "model", None), "args", None) or {}
+    imgsz = args.get("imgsz", DEFAULT_IMGSZ) if isinstance(args, dict) else getattr(args, "imgsz", DEFAULT_IMGSZ)
+    if isinstance(imgsz, (list, tuple)):
+        imgsz = max(imgsz)
+    return int(imgsz)
+
+
+def letterbox_params(shape: Tuple[int, int], imgsz: int) -> Tuple[float, int, int, int, int]:
+    """Scale ratio, resized width/height and left/top padding that fit a (h, w) frame into imgsz x imgsz."""
+    height, width = shape[:2]
+    ratio = min(imgsz / height, imgsz / width)
+    new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+    left, top = (imgsz - new_width) // 2, (imgsz - new_height) // 2
+    return ratio, new_width, new_height, left, top
+
+
+def scale_boxes(boxes: torch.Tensor, meta: Tuple[float, int, int, Tuple[int, int]]) -> torch.Tensor:
+    """Map xyxy boxes from letterboxed model input coordinates back to the original frame, in place."""
+    ratio, left, top, (height, width) = meta
+    boxes[:, [0, 2]] -= left
+    boxes[:, [1, 3]] -= top
+    boxes[:, :4] /= ratio
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clamp(0, width)
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clamp(0, height)
+    return boxes
+
+
+class Preprocessor:
+    """
+    Letterboxes BGR frames to the model input size, converts them to RGB and normalises them into
+    a preallocated input tensor, so that no full-resolution float copy of the frame is ever made.
+    The buffers are reused across calls and only grow when a larger batch arrives.
+    """
+
+    def __init__(self, imgsz: int, device: torch.device, half: bool = False, batch_size: int = 1):
+        self.imgsz = imgsz
+        self.device = device
+        self.dtype = torch.float16 if half else torch.float32
+        self._host = None
+        self._input = None
+        self._allocate(batch_size)
+
+    def _allocate(self, batch_size: int):
+        self._host = np.full((batch_size, self.imgsz, self.imgsz, 3), LETTERBOX_COLOR, dtype=np.uint8)
+        self._input = torch.empty((batch_size, 3, self.imgsz, self.imgsz), dtype=self.dtype, device=self.device)
+
+    def __call__(self, frames: List[np.ndarray]) -> Tuple[torch.Tensor, List[tuple]]:
+        """
+        Returns the (n, 3, imgsz, imgsz) input tensor, a view of the reused buffer valid until the next call,
+        and for each frame the (ratio, left, top, original shape) needed by scale_boxes().
+        """
+        if len(frames) > self._host.shape[0]:
+            self._allocate(len(frames))
+
+        metas = []
+        for index, frame in enumerate(frames):
+            ratio, new_width, new_height, left, top = letterbox_params(frame.shape, self.imgsz)
+            slot = self._host[index]
+            slot[...] = LETTERBOX_COLOR
+            resized = frame if (new_width, new_height) == (frame.shape[1], frame.shape[0]) else \
+                cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+            # BGR -> RGB while copying into the padded slot
+            slot[top:top + new_height, left:left + new_width] = resized[..., ::-1]
+            metas.append((ratio, left, top, frame.shape[:2]))
+
+        count = len(frames)
+        batch = self._input[:count]
+        # uint8 NHWC -> float NCHW in [0, 1], converted on the target device
+        batch.copy_(torch.from_numpy(self._host[:count]).to(self.device, non_blocking=True).permute(0, 3, 1, 2))
+        batch.mul_(1.0 / 255.0)
+        return batch, metas
@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+import torch
+from ultralytics import YOLO
+
+from detection.service.model_service import (
+    export_model, get_exported_model_path, get_my_model_path, load_my_model
+)
+from detection.service.preprocessing import Preprocessor, model_imgsz
+
+try:
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, quantize_static
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+except ImportError:  # Only needed to quantise for the onnx backend
+    onnx = None
+    CalibrationDataReader = object
+
+logger = logging.getLogger(__name__)
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "dataset_custom")
+CALIBRATION_DIR = os.path.join(DATASET_DIR, "images", "valid")
+DATA_YAML_PATH = os.path.join(DATASET_DIR, "data.yaml")
+
+# Number of validation images fed through the model to collect activation ranges
+MAX_CALIBRATION_IMAGES = 300
+
+# Ops of the detection head that decode boxes (DFL softmax, anchors, strides); they stay in FP32
+# because their outputs are coordinates, where INT8 rounding costs far more mAP than it saves time.
+HEAD_DECODE_OPS = {"Concat", "Split", "Reshape", "Transpose", "Softmax", "Sigmoid", "Sub", "Add", "Mul", "Div"}
+
+
+def find_calibration_images(image_dir: str = CALIBRATION_DIR, limit: int = MAX_CALIBRATION_IMAGES) -> List[str]:
+    """Validation images of every piece (dataset_custom/images/valid/<piece_label>/...), capped at `limit`."""
+    images = []
+    for root, _, files in os.walk(image_dir):
+        for name in sorted(files):
+            if name.lower().endswith((".jpg", ".jpeg", ".png", ".bmp")):
+                images.append(os.path.join(root, name))
+    # Spread the sample over all pieces rather than taking the first directories only
+    if len(images) > limit:
+        step = len(images) / limit
+        images = [images[int(i * step)] for i in range(limit)]
+    return images
+
+
+class ImageCalibrationReader(CalibrationDataReader):
+    """Feeds validation images, preprocessed exactly like live frames, to the ONNX Runtime calibrator."""
+
+    def __init__(self, image_paths: List[str], input_name: str, imgsz: int):
+        self.image_paths = iter(image_paths)
+        self.input_name = input_name
+        self.preprocessor = Preprocessor(imgsz, torch.device('cpu'))
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        for path in self.image_paths:
+            image = cv2.imread(path)
+            if image is None:
+                continue
+            batch, _ = self.preprocessor([image])
+            return {self.input_name: batch.numpy().copy()}
+        return None
+
+
+def _head_decode_nodes(model) -> List[str]:
+    """Names of the box-decoding nodes in the last module of the graph (the Detect head)."""
+    prefixes = sorted({node.name.split("/")[1] for node in model.graph.node if node.name.startswith("/model.")},
+                      key=lambda name: int(name.split(".")[1]))
+    head = f"/{prefixes[-1]}/" if prefixes else None
+    return [node.name for node in model.graph.node
+            if head and node.name.startswith(head) and node.op_type in HEAD_DECODE_OPS]
+
+
+def quantize_onnx(image_paths: List[str]) -> str:
+    """Static INT8 quantisation (QDQ, per-channel weights) of the exported ONNX model."""
+    if onnx is None:
+        raise RuntimeError("onnx and onnxruntime are required to quantise for the onnx backend.")
+
+    fp32_path = get_exported_model_path("onnx")
+    if not os.path.isfile(fp32_path):
+        fp32_path = str(export_model("onnx"))
+    int8_path = get_exported_model_path("onnx_int8")
+
+    prepared_path = int8_path.replace(".onnx", "_prepared.onnx")
+    quant_pre_process(fp32_path, prepared_path)
+
+    fp32_model = onnx.load(fp32_path)
+    input_name = fp32_model.graph.input[0].name
+    imgsz = fp32_model.graph.input[0].type.tensor_type.shape.dim[2].dim_value
+
+    try:
+        quantize_static(
+            prepared_path,
+            int8_path,
+            ImageCalibrationReader(image_paths, input_name, imgsz),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=CalibrationMethod.MinMax,
+            nodes_to_exclude=_head_decode_nodes(fp32_model),
+        )
+    finally:
+        if os.path.exists(prepared_path):
+            os.remove(prepared_path)
+
+    # Keep the class names and input size the ultralytics exporter stored on the FP32 graph
+    int8_model = onnx.load(int8_path)
+    del int8_model.metadata_props[:]
+    int8_model.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(int8_model, int8_path)
+    return int8_path
+
+
+def quantize_openvino() -> str:
+    """INT8 OpenVINO IR, calibrated by NNCF on the validation split of dataset_custom/data.yaml."""
+    model = load_my_model()
+    if model is None:
+        raise FileNotFoundError(f"Model file not found at: {get_my_model_path()}")
+    model.export(format="openvino", imgsz=model_imgsz(model), int8=True, data=DATA_YAML_PATH)
+    return get_exported_model_path("openvino_int8")
+
+
+def evaluate_map(model_path: str, imgsz: int) -> Dict[str, float]:
+    """mAP of a model (any format ultralytics can load) on the validation split."""
+    metrics = YOLO(model_path, task="detect").val(data=DATA_YAML_PATH, imgsz=imgsz, batch=1, device="cpu",
+                                                  split="val", plots=False, verbose=False)
+    return {"map50": float(metrics.box.map50), "map50_95": float(metrics.box.map)}
+
+
+def quantize_model(backend: str = "onnx") -> Dict:
+    """
+    Produce the INT8 model for `backend` ("onnx" or "openvino") from the validation images, evaluate it
+    against the FP32 model on the validation split and save the report next to the INT8 model.
+    Select it for inference with INFERENCE_BACKEND=onnx_int8 or openvino_int8.
+    """
+    if backend not in ("onnx", "openvino"):
+        raise ValueError(f"Unsupported quantisation backend: {backend}")
+    if not os.path.isfile(DATA_YAML_PATH):
+        raise FileNotFoundError(f"data.yaml file not found at {DATA_YAML_PATH}")
+
+    image_paths = find_calibration_images()
+    if not image_paths:
+        raise FileNotFoundError(f"No calibration images found under {CALIBRATION_DIR}")
+    logger.info(f"Quantising the {backend} model with {len(image_paths)} calibration images.")
+
+    int8_path = quantize_onnx(image_paths) if backend == "onnx" else quantize_openvino()
+
+    imgsz = model_imgsz(YOLO(get_my_model_path()))
+    fp32_metrics = evaluate_map(get_my_model_path(), imgsz)
+    int8_metrics = evaluate_map(int8_path, imgsz)
+
+    report = {
+        "backend": f"{backend}_int8",
+        "model_path": int8_path,
+        "calibration_images": len(image_paths),
+        "imgsz": imgsz,
+        "fp32": fp32_metrics,
+        "int8": int8_metrics,
+        "map50_delta": int8_metrics["map50"] - fp32_metrics["map50"],
+        "map50_95_delta": int8_metrics["map50_95"] - fp32_metrics["map50_95"],
+        "created_at": datetime.now().isoformat(),
+    }
+    report_path = os.path.splitext(int8_path.rstrip(os.sep))[0] + "_report.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    logger.info(f"INT8 model saved to {int8_path}: mAP50 {fp32_metrics['map50']:.4f} -> {int8_metrics['map50']:.4f} "
+                f"({report['map50_delta']:+.4f}), mAP50-95 delta {report['map50_95_delta']:+.4f}")
+    return report
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Optional, Set
+
+from detection.service.stream_pipeline import DropOldestQueue
+
+logger = logging.getLogger(__name__)
+
+# Encoded frames buffered per viewer; a viewer that falls further behind loses its oldest frames
+DEFAULT_QUEUE_SIZE = 2
+
+
+class StreamHub:
+    """
+    One running stream shared by every viewer of it. The source (an async iterator of encoded MJPEG
+    parts) is started by the first subscriber and each part is produced once, then put in a bounded
+    DropOldestQueue per subscriber, so a slow client only skips frames and never holds up the others.
+    When the last subscriber leaves the source is closed, which releases its cameras.
+    """
+
+    def __init__(self, key: Hashable, source_factory: Callable[[], AsyncIterator[bytes]],
+                 queue_size: int = DEFAULT_QUEUE_SIZE, on_close: Optional[Callable[["StreamHub"], Any]] = None):
+        self.key = key
+        self.source_factory = source_factory
+        self.queue_size = queue_size
+        self.on_close = on_close
+        self.closed = False
+        self._subscribers: Set[DropOldestQueue] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def viewers(self) -> int:
+        return len(self._subscribers)
+
+    async def _run(self):
+        source = self.source_factory()
+        try:
+            async for chunk in source:
+                for queue in self._subscribers:
+                    queue.put(chunk)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Stream {self.key} failed: {e}")
+        finally:
+            self._close()
+            # Runs the source's own cleanup (camera release, stop flags)
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def _close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for queue in self._subscribers:
+            queue.close()
+        if self.on_close is not None:
+            self.on_close(self)
+
+    async def subscribe(self) -> AsyncIterator[bytes]:
+        """Yield the encoded parts of the stream from now on, until it ends or the client disconnects."""
+        queue = DropOldestQueue(self.queue_size)
+        self._subscribers.add(queue)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        logger.info(f"Stream {self.key}: {self.viewers} viewer(s).")
+        try:
+            async for chunk in queue:
+                yield chunk
+        finally:
+            self._subscribers.discard(queue)
+            if queue.dropped:
+                logger.debug(f"Stream {self.key}: {queue.dropped} frame(s) dropped for a slow viewer.")
+            if not self._subscribers and self._task is not None:
+                # Last viewer gone: stop capturing and encoding
+                self._close()
+                self._task.cancel()
+
+
+class StreamHubRegistry:
+    """The live hubs by stream key; all access happens on the event loop, so no locking is needed."""
+
+    def __init__(self):
+        self._hubs: Dict[Hashable, StreamHub] = {}
+
+    def subscribe(self, key: Hashable, source_factory: Callable[[], AsyncIterator[bytes]],
+                  queue_size: int = DEFAULT_QUEUE_SIZE) -> AsyncIterator[bytes]:
+        """
+        Join the stream for `key`, starting it with `source_factory()` if nobody is watching it yet.
+        Viewers asking for the same key share one capture and one encode per frame.
+        """
+        hub = self._hubs.get(key)
+        if hub is None or hub.closed:
+            hub = StreamHub(key, source_factory, queue_size, on_close=self._remove)
+            self._hubs[key] = hub
+        return hub.subscribe()
+
+    def _remove(self, hub: StreamHub):
+        if self._hubs.get(hub.key) is hub:
+            del self._hubs[hub.key]
+
+    def viewers(self) -> Dict[Hashable, int]:
+        return {key: hub.viewers for key, hub in self._hubs.items()}
+
+
+stream_hubs = StreamHubRegistry()
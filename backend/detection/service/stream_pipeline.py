@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Returned by the source to end the stream
+END = object()
+# Put in a queue by the stage that feeds it, once that stage has finished
+_CLOSED = object()
+
+
+class DropOldestQueue:
+    """
+    Bounded asyncio queue that never blocks the producer: when it is full the oldest item is
+    discarded to make room, so a slow consumer always gets the newest data instead of a backlog.
+    """
+
+    def __init__(self, maxsize: int = 1):
+        # The bound is enforced in put() so that close() can always append its marker
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.maxsize = maxsize
+        self.dropped = 0
+
+    def put(self, item: Any):
+        while self._queue.qsize() >= self.maxsize:
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(item)
+
+    async def get(self) -> Any:
+        return await self._queue.get()
+
+    def close(self):
+        self._queue.put_nowait(_CLOSED)
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        """Yield the items until the queue is closed."""
+        while True:
+            item = await self.get()
+            if item is _CLOSED:
+                return
+            yield item
+
+
+class StreamPipeline:
+    """
+    Runs a source and a chain of stages as separate tasks connected by DropOldestQueues, so that
+    acquisition, inference and encoding overlap and the throughput is set by the slowest stage.
+
+    `source()` is awaited repeatedly and returns the next item, None to produce nothing this time,
+    or END to finish. Each stage receives the previous stage's item and returns its own item, or
+    None to drop it. Iterating the pipeline yields the items of the last stage (the send stage).
+    """
+
+    def __init__(self, source: Callable[[], Awaitable[Any]], stages: List[Callable[[Any], Awaitable[Any]]],
+                 queue_size: int = 1, name: str = "stream"):
+        self.source = source
+        self.stages = stages
+        self.queue_size = queue_size
+        self.name = name
+        self.error: Optional[BaseException] = None
+
+    async def _run_source(self, out_queue: DropOldestQueue):
+        try:
+            while True:
+                item = await self.source()
+                if item is END:
+                    break
+                if item is not None:
+                    out_queue.put(item)
+                # Let the other stages run even when the source never has to wait
+                await asyncio.sleep(0)
+        except Exception as e:
+            self.error = e
+            logger.error(f"{self.name}: source failed: {e}")
+        finally:
+            out_queue.close()
+
+    async def _run_stage(self, stage: Callable[[Any], Awaitable[Any]], in_queue: DropOldestQueue,
+                         out_queue: DropOldestQueue):
+        try:
+            while True:
+                item = await in_queue.get()
+                if item is _CLOSED:
+                    break
+                result = await stage(item)
+                if result is not None:
+                    out_queue.put(result)
+        except Exception as e:
+            self.error = e
+            logger.error(f"{self.name}: stage {getattr(stage, '__name__', stage)} failed: {e}")
+        finally:
+            out_queue.close()
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        queues = [DropOldestQueue(self.queue_size) for _ in range(len(self.stages) + 1)]
+        tasks = [asyncio.create_task(self._run_source(queues[0]))]
+        for index, stage in enumerate(self.stages):
+            tasks.append(asyncio.create_task(self._run_stage(stage, queues[index], queues[index + 1])))
+
+        try:
+            while True:
+                item = await queues[-1].get()
+                if item is _CLOSED:
+                    break
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            dropped = sum(queue.dropped for queue in queues)
+            if dropped:
+                logger.debug(f"{self.name}: {dropped} item(s) dropped between stages.")
@@ -0,0 +1,184 @@
+import math
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from detection.service.postprocessing import Detections
+
+# Tile side in frame pixels; 0 disables tiling and the whole frame is letterboxed as before
+DEFAULT_TILE_SIZE = int(os.getenv("TILE_SIZE", "0"))
+# Fraction of the tile side shared with the neighbouring tile
+DEFAULT_TILE_OVERLAP = float(os.getenv("TILE_OVERLAP", "0.2"))
+# Most tiles run per frame; above it the tiles are enlarged until the grid fits
+DEFAULT_MAX_TILES = int(os.getenv("TILE_MAX_TILES", "16"))
+# Also run the downscaled whole frame, so pieces larger than a tile are still found in one piece
+DEFAULT_FULL_FRAME = os.getenv("TILE_FULL_FRAME", "1").lower() not in ("0", "false", "no")
+# Halves of a piece cut by a seam are merged above this intersection over the smaller box
+MERGE_THRESHOLD = 0.5
+# Any other same-class pair is a duplicate above this IoU
+NMS_IOU = 0.5
+# A box within this many pixels of an inner tile edge counts as reaching the seam
+SEAM_MARGIN = 2
+
+
+@dataclass
+class TilingConfig:
+    tile_size: int = DEFAULT_TILE_SIZE
+    overlap: float = DEFAULT_TILE_OVERLAP
+    max_tiles: int = DEFAULT_MAX_TILES
+    full_frame: bool = DEFAULT_FULL_FRAME
+    merge_threshold: float = MERGE_THRESHOLD
+
+    @classmethod
+    def from_env(cls) -> Optional["TilingConfig"]:
+        """The configuration given by the TILE_* variables, or None when TILE_SIZE leaves tiling off."""
+        return cls() if DEFAULT_TILE_SIZE > 0 else None
+
+    def __post_init__(self):
+        if self.tile_size <= 0:
+            raise ValueError("tile_size must be positive")
+        if not 0 <= self.overlap < 1:
+            raise ValueError("overlap must be in [0, 1)")
+        if self.max_tiles < 1:
+            raise ValueError("max_tiles must be at least 1")
+
+
+def _axis_starts(length: int, tile: int, overlap: float) -> List[int]:
+    """Evenly spread tile origins along one axis, the last tile ending exactly on the frame edge."""
+    if length <= tile:
+        return [0]
+    stride = max(1, int(tile * (1 - overlap)))
+    count = math.ceil((length - tile) / stride) + 1
+    step = (length - tile) / (count - 1)
+    return [int(round(index * step)) for index in range(count)]
+
+
+def tile_grid(shape: Tuple[int, int], config: TilingConfig) -> List[Tuple[int, int, int, int]]:
+    """
+    (x1, y1, x2, y2) tiles covering a (h, w) frame with the configured overlap. When the grid would
+    exceed the tile budget (less the whole-frame pass), the tile side is grown until it fits.
+    """
+    height, width = shape[:2]
+    budget = max(1, config.max_tiles - (1 if config.full_frame else 0))
+    tile = min(config.tile_size, max(height, width))
+    while True:
+        tile_height, tile_width = min(tile, height), min(tile, width)
+        xs = _axis_starts(width, tile_width, config.overlap)
+        ys = _axis_starts(height, tile_height, config.overlap)
+        if len(xs) * len(ys) <= budget or tile >= max(height, width):
+            break
+        tile = int(tile * 1.25) + 1
+    return [(x, y, x + tile_width, y + tile_height) for y in ys for x in xs]
+
+
+def split_tiles(frame: np.ndarray, config: TilingConfig) -> Tuple[List[np.ndarray], List[Tuple[int, int, int, int]]]:
+    """
+    The tile views of one frame (no copies) and the (x1, y1, x2, y2) region of each in the frame.
+    The whole-frame pass, when enabled, comes last with the whole frame as its region.
+    """
+    tiles, regions = [], []
+    for x1, y1, x2, y2 in tile_grid(frame.shape, config):
+        tiles.append(frame[y1:y2, x1:x2])
+        regions.append((x1, y1, x2, y2))
+    if config.full_frame and len(tiles) > 1:
+        tiles.append(frame)
+        regions.append((0, 0, frame.shape[1], frame.shape[0]))
+    return tiles, regions
+
+
+def _seam_boxes(boxes: np.ndarray, box_regions: np.ndarray, frame_size: Tuple[int, int]) -> np.ndarray:
+    """Boxes that reach an edge of their tile lying inside the frame, i.e. that may have been cut by a seam."""
+    width, height = frame_size
+    x1, y1, x2, y2 = box_regions.T
+    return (((x1 > 0) & (boxes[:, 0] <= x1 + SEAM_MARGIN)) | ((y1 > 0) & (boxes[:, 1] <= y1 + SEAM_MARGIN))
+            | ((x2 < width) & (boxes[:, 2] >= x2 - SEAM_MARGIN)) | ((y2 < height) & (boxes[:, 3] >= y2 - SEAM_MARGIN)))
+
+
+def merge_nms(boxes: np.ndarray, confidences: np.ndarray, class_ids: np.ndarray, tile_ids: np.ndarray,
+              regions: List[Tuple[int, int, int, int]], whole_frame: Optional[int] = None,
+              threshold: float = MERGE_THRESHOLD, iou_threshold: float = NMS_IOU) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Greedy per-class NMS over the boxes of every tile, highest confidence first. Two boxes from
+    different tiles that both reach the seam between them are halves of one cut piece: they are
+    matched by intersection over the smaller box and replaced by their union. Every other pair,
+    including any pair with a box from the whole-frame pass (tile `whole_frame`), is ordinary IoU
+    NMS, so neighbouring pieces of the same class are never fused.
+    Returns the indices kept and their (possibly merged) boxes.
+    """
+    if not len(boxes):
+        return np.zeros(0, np.int64), np.zeros((0, 4), np.float32)
+    region_array = np.asarray(regions, np.float32)
+    box_regions = region_array[tile_ids]
+    frame_size = (region_array[:, 2].max(), region_array[:, 3].max())
+    on_seam = _seam_boxes(boxes, box_regions, frame_size)
+    if whole_frame is not None:
+        on_seam &= tile_ids != whole_frame
+    areas = (boxes[:, 2] - boxes[:, 0]).clip(0) * (boxes[:, 3] - boxes[:, 1]).clip(0)
+
+    def overlaps(box: np.ndarray, others: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """IoU and intersection over the smaller box of `box` against the boxes `others` (indices)."""
+        width = (np.minimum(box[2], boxes[others, 2]) - np.maximum(box[0], boxes[others, 0])).clip(0)
+        height = (np.minimum(box[3], boxes[others, 3]) - np.maximum(box[1], boxes[others, 1])).clip(0)
+        intersection = width * height
+        area = max(float((box[2] - box[0]) * (box[3] - box[1])), 0.0)
+        iou = intersection / np.maximum(area + areas[others] - intersection, 1e-6)
+        ios = intersection / np.maximum(np.minimum(area, areas[others]), 1e-6)
+        return iou, ios
+
+    order = np.argsort(-confidences, kind="stable")
+    keep, merged = [], []
+    while len(order):
+        best, rest = order[0], order[1:]
+        same_class = class_ids[rest] == class_ids[best]
+        _, ios = overlaps(boxes[best], rest)
+
+        # Both boxes must also overlap the region the two tiles share, where the seam runs
+        shared = np.concatenate([np.maximum(box_regions[rest, :2], box_regions[best, :2]),
+                                 np.minimum(box_regions[rest, 2:], box_regions[best, 2:])], axis=1)
+        in_shared = ((np.minimum(boxes[rest, 2], boxes[best, 2]) > shared[:, 0])
+                     & (np.maximum(boxes[rest, 0], boxes[best, 0]) < shared[:, 2])
+                     & (np.minimum(boxes[rest, 3], boxes[best, 3]) > shared[:, 1])
+                     & (np.maximum(boxes[rest, 1], boxes[best, 1]) < shared[:, 3]))
+        seam_pair = (tile_ids[rest] != tile_ids[best]) & on_seam[best] & on_seam[rest] & in_shared
+        fused = same_class & seam_pair & (ios > threshold)
+
+        group = boxes[np.append(best, rest[fused])]
+        box = np.concatenate([group[:, :2].min(axis=0), group[:, 2:].max(axis=0)])
+        # The rejoined piece, not its cut half, is what duplicates (e.g. from the whole-frame pass) are compared with
+        iou, _ = overlaps(box, rest)
+        suppressed = same_class & ~seam_pair & (iou > iou_threshold)
+
+        keep.append(best)
+        merged.append(box)
+        order = rest[~(fused | suppressed)]
+    return np.asarray(keep, np.int64), np.asarray(merged, np.float32)
+
+
+def merge_tiles(tile_detections: List[Detections], regions: List[Tuple[int, int, int, int]],
+                threshold: float = MERGE_THRESHOLD) -> Detections:
+    """
+    Shift the detections of every tile into frame coordinates and merge the duplicates: pieces cut by
+    a seam, and pieces found both in the tiles and in the whole-frame pass (the last region, when it
+    covers the whole frame).
+    """
+    names = tile_detections[0].names if tile_detections else {}
+    if not tile_detections or not any(len(detections) for detections in tile_detections):
+        return Detections.empty(names)
+
+    boxes = np.concatenate([detections.boxes + np.array([x1, y1, x1, y1], np.float32)
+                            for detections, (x1, y1, _, _) in zip(tile_detections, regions)])
+    confidences = np.concatenate([detections.confidences for detections in tile_detections])
+    class_ids = np.concatenate([detections.class_ids for detections in tile_detections])
+    tile_ids = np.concatenate([np.full(len(detections), index, np.int64)
+                               for index, detections in enumerate(tile_detections)])
+
+    whole_frame = None
+    if len(regions) > 1:
+        width, height = max(region[2] for region in regions), max(region[3] for region in regions)
+        if tuple(regions[-1]) == (0, 0, width, height):
+            whole_frame = len(regions) - 1
+
+    keep, merged_boxes = merge_nms(boxes, confidences, class_ids, tile_ids, regions, whole_frame, threshold)
+    return Detections(boxes=merged_boxes, confidences=confidences[keep], class_ids=class_ids[keep], names=names)
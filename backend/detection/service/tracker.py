@@ -0,0 +1,213 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from detection.service.postprocessing import Detections
+
+# Run the model at least this often (seconds) even when every track is certain
+DEFAULT_REFRESH_INTERVAL = float(os.getenv("TRACK_REFRESH_INTERVAL", "0.5"))
+# Detections at or above this confidence are matched first and may start tracks (ByteTrack's high score set)
+HIGH_CONFIDENCE = 0.6
+# Minimum IoU between a track's predicted box and a detection for them to be associated
+MATCH_IOU = 0.2
+# Detections a track needs before it is shown and counted, so a single spurious box never reaches a decision
+MIN_HITS = 2
+# Model runs a confirmed track may go unmatched before it is dropped
+MAX_MISSES = 2
+# Predicted position spread, relative to the box height, above which the model must run again
+MAX_UNCERTAINTY = 0.25
+# Weight kept by the previous class votes at every update
+CLASS_MEMORY = 0.8
+
+# Kalman noise, as fractions of the box height (per second for the process noise)
+MEASUREMENT_NOISE = 0.05
+POSITION_NOISE = 0.1
+VELOCITY_NOISE = 0.5
+INITIAL_VELOCITY_STD = 2.0
+
+
+def box_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """(n, m) IoU matrix of two sets of xyxy boxes."""
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.prod((bottom_right - top_left).clip(0), axis=2)
+    area_a = np.prod((boxes_a[:, 2:] - boxes_a[:, :2]).clip(0), axis=1)
+    area_b = np.prod((boxes_b[:, 2:] - boxes_b[:, :2]).clip(0), axis=1)
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-6)
+
+
+class KalmanBoxFilter:
+    """Constant-velocity Kalman filter over (cx, cy, w, h); time steps are in seconds since frames arrive irregularly."""
+
+    def __init__(self, box: np.ndarray):
+        center_x, center_y = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+        width, height = box[2] - box[0], box[3] - box[1]
+        self.x = np.array([center_x, center_y, width, height, 0, 0, 0, 0], dtype=np.float64)
+        scale = max(height, 1.0)
+        self.P = np.diag(np.square([2 * MEASUREMENT_NOISE * scale] * 4 + [INITIAL_VELOCITY_STD * scale] * 4))
+
+    def predict(self, dt: float):
+        if dt <= 0:
+            return
+        transition = np.eye(8)
+        transition[:4, 4:] = dt * np.eye(4)
+        scale = max(self.x[3], 1.0)
+        noise = np.square([POSITION_NOISE * scale] * 4 + [VELOCITY_NOISE * scale] * 4) * dt
+        self.x = transition @ self.x
+        self.P = transition @ self.P @ transition.T + np.diag(noise)
+
+    def update(self, box: np.ndarray):
+        measurement = np.array([(box[0] + box[2]) / 2, (box[1] + box[3]) / 2, box[2] - box[0], box[3] - box[1]])
+        scale = max(self.x[3], 1.0)
+        innovation_cov = self.P[:4, :4] + np.diag(np.square([MEASUREMENT_NOISE * scale] * 4))
+        gain = self.P[:, :4] @ np.linalg.inv(innovation_cov)
+        self.x = self.x + gain @ (measurement - self.x[:4])
+        self.P = self.P - gain @ self.P[:4, :]
+
+    @property
+    def box(self) -> np.ndarray:
+        center_x, center_y = self.x[:2]
+        width, height = max(self.x[2], 1.0), max(self.x[3], 1.0)
+        return np.array([center_x - width / 2, center_y - height / 2, center_x + width / 2, center_y + height / 2])
+
+    @property
+    def uncertainty(self) -> float:
+        """Standard deviation of the predicted centre, relative to the box height."""
+        return float(np.sqrt(self.P[0, 0] + self.P[1, 1]) / max(self.x[3], 1.0))
+
+
+class Track:
+    """One piece followed across frames: its filtered box, a confidence average and decaying class votes."""
+
+    def __init__(self, track_id: int, box: np.ndarray, confidence: float, class_id: int, timestamp: float):
+        self.track_id = track_id
+        self.filter = KalmanBoxFilter(box)
+        self.confidence = confidence
+        self.class_votes: Dict[int, float] = {class_id: confidence}
+        self.hits = 1
+        self.misses = 0
+        self.timestamp = timestamp
+
+    @property
+    def class_id(self) -> int:
+        return max(self.class_votes, key=self.class_votes.get)
+
+    @property
+    def confirmed(self) -> bool:
+        return self.hits >= MIN_HITS
+
+    def predict(self, timestamp: float):
+        self.filter.predict(timestamp - self.timestamp)
+        self.timestamp = max(self.timestamp, timestamp)
+
+    def update(self, box: np.ndarray, confidence: float, class_id: int):
+        self.filter.update(box)
+        self.confidence += 0.5 * (confidence - self.confidence)
+        # A label that flickers for one frame does not flip the piece's class
+        self.class_votes = {key: vote * CLASS_MEMORY for key, vote in self.class_votes.items()}
+        self.class_votes[class_id] = self.class_votes.get(class_id, 0.0) + confidence
+        self.hits += 1
+        self.misses = 0
+
+
+class PieceTracker:
+    """
+    Lightweight ByteTrack-style tracker for one camera. `update()` associates a frame's detections
+    with the existing tracks (high-confidence detections first, then the rest) by IoU against the
+    Kalman-predicted boxes; `predict()` carries the boxes forward on frames the model skipped.
+    `needs_detection()` tells the feed when the model has to run again: periodically, while tracks
+    are unconfirmed, or once a predicted box has drifted too far to trust.
+    """
+
+    def __init__(self, refresh_interval: float = DEFAULT_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.tracks: List[Track] = []
+        self.names: Dict[int, str] = {}
+        self._next_id = 1
+        self._last_detection: Optional[float] = None
+
+    def predict(self, timestamp: float) -> Detections:
+        """Advance every track to `timestamp` and return the confirmed ones."""
+        for track in self.tracks:
+            track.predict(timestamp)
+        return self.detections()
+
+    def needs_detection(self, timestamp: float) -> bool:
+        if self._last_detection is None or not self.tracks:
+            return True
+        if timestamp - self._last_detection >= self.refresh_interval:
+            return True
+        return self.unsettled(timestamp)
+
+    def unsettled(self, timestamp: float) -> bool:
+        """
+        True while a track is unconfirmed or its predicted box is too uncertain. Such a camera needs the
+        model even when its scene looks still, or the track would stay hidden (or adrift) until the next change.
+        """
+        self.predict(timestamp)
+        return any(not track.confirmed or track.filter.uncertainty > MAX_UNCERTAINTY for track in self.tracks)
+
+    def _match(self, track_indices: List[int], detection_indices: List[int],
+               boxes: np.ndarray) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
+        """Optimal IoU assignment; returns the matched pairs and the unmatched track and detection indices."""
+        if not track_indices or not detection_indices:
+            return [], track_indices, detection_indices
+        predicted = np.array([self.tracks[index].filter.box for index in track_indices])
+        iou = box_iou(predicted, boxes[detection_indices])
+        rows, columns = linear_sum_assignment(-iou)
+        matches = [(track_indices[row], detection_indices[column])
+                   for row, column in zip(rows, columns) if iou[row, column] >= MATCH_IOU]
+        matched_tracks = {track for track, _ in matches}
+        matched_detections = {detection for _, detection in matches}
+        return (matches,
+                [index for index in track_indices if index not in matched_tracks],
+                [index for index in detection_indices if index not in matched_detections])
+
+    def update(self, detections: Detections, timestamp: float) -> Detections:
+        """Feed the detections of a frame the model ran on, and return the confirmed tracks."""
+        self.predict(timestamp)
+        self._last_detection = timestamp
+        if detections.names:
+            self.names = detections.names
+
+        boxes = detections.boxes.astype(np.float64)
+        confidences = detections.confidences.tolist()
+        class_ids = detections.class_ids.tolist()
+        high = [index for index, confidence in enumerate(confidences) if confidence >= HIGH_CONFIDENCE]
+        low = [index for index, confidence in enumerate(confidences) if confidence < HIGH_CONFIDENCE]
+
+        matches, unmatched_tracks, unmatched_high = self._match(list(range(len(self.tracks))), high, boxes)
+        # Low-confidence boxes only keep existing tracks alive, they never start one
+        low_matches, unmatched_tracks, _ = self._match(unmatched_tracks, low, boxes)
+        for track_index, detection_index in matches + low_matches:
+            self.tracks[track_index].update(boxes[detection_index], confidences[detection_index], class_ids[detection_index])
+
+        for track_index in unmatched_tracks:
+            self.tracks[track_index].misses += 1
+        self.tracks = [track for index, track in enumerate(self.tracks) if index not in unmatched_tracks
+                       or (track.confirmed and track.misses <= MAX_MISSES)]
+
+        for detection_index in unmatched_high:
+            self.tracks.append(Track(self._next_id, boxes[detection_index], confidences[detection_index],
+                                     class_ids[detection_index], timestamp))
+            self._next_id += 1
+        return self.detections()
+
+    def detections(self) -> Detections:
+        """The confirmed tracks as Detections, with their track ids."""
+        tracks = [track for track in self.tracks if track.confirmed]
+        if not tracks:
+            return Detections.empty(self.names)
+        return Detections(
+            boxes=np.array([track.filter.box for track in tracks], np.float32),
+            confidences=np.array([track.confidence for track in tracks], np.float32),
+            class_ids=np.array([track.class_id for track in tracks], np.int64),
+            names=self.names,
+            track_ids=np.array([track.track_id for track in tracks], np.int64),
+        )
+
+    def reset(self):
+        self.tracks = []
+        self._last_detection = None
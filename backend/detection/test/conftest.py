@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+
+from detection.service.postprocessing import Detections
+
+NAMES = {0: "bracket", 1: "fastener"}
+
+
+def detections(*rows) -> Detections:
+    """Detections from (x1, y1, x2, y2, confidence, class_id) rows, with the class names of NAMES."""
+    if not rows:
+        return Detections.empty(NAMES)
+    data = np.array(rows, np.float32)
+    return Detections(data[:, :4], data[:, 4], data[:, 5].astype(np.int64), NAMES)
+
+
+@pytest.fixture
+def make_detections():
+    return detections
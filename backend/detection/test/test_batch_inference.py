@@ -0,0 +1,69 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+from detection.service.batch_inference import BatchInferenceEngine
+
+
+def run_cancelled_caller(run_batch):
+    """Two callers share a batch; the first is cancelled while the batch runs. Returns the second's result."""
+    engine = BatchInferenceEngine(run_batch, max_wait=0.2)
+
+    async def scenario():
+        first = asyncio.ensure_future(engine.infer(np.zeros(1), "first"))
+        second = asyncio.ensure_future(engine.infer(np.zeros(1), "second"))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        return await asyncio.wait_for(second, timeout=2)
+
+    try:
+        return asyncio.run(scenario())
+    finally:
+        engine.stop()
+
+
+def test_cancelled_caller_does_not_block_the_rest_of_the_batch():
+    def run_batch(frames, contexts):
+        threading.Event().wait(0.3)  # The first caller is cancelled meanwhile
+        return list(contexts)
+
+    assert run_cancelled_caller(run_batch) == "second"
+
+
+def test_cancelled_caller_does_not_block_a_batch_run_elsewhere():
+    def run_batch(frames, contexts):
+        result: Future = Future()
+        threading.Timer(0.3, result.set_result, [list(contexts)]).start()
+        return result
+
+    assert run_cancelled_caller(run_batch) == "second"
+
+
+def test_batch_thread_survives_a_cancelled_caller():
+    engine = BatchInferenceEngine(lambda frames, contexts: list(contexts))
+    cancelled = engine.submit(np.zeros(1), "cancelled")
+    cancelled.cancel()
+    try:
+        assert engine.submit(np.zeros(1), "next").result(timeout=2) == "next"
+    finally:
+        engine.stop()
+
+
+def test_short_result_list_fails_the_remaining_callers():
+    engine = BatchInferenceEngine(lambda frames, contexts: list(contexts)[:1], max_wait=0.2)
+    futures = [engine.submit(np.zeros(1), index) for index in range(2)]
+    try:
+        assert futures[0].result(timeout=2) == 0
+        assert isinstance(futures[1].exception(timeout=2), RuntimeError)
+    finally:
+        engine.stop()
+
+
+def test_stop_fails_queued_callers():
+    engine = BatchInferenceEngine(lambda frames, contexts: list(contexts))
+    queued: Future = Future()
+    engine._queue.put((np.zeros(1), None, queued))  # Never batched: the engine was not started
+    engine.stop()
+    assert isinstance(queued.exception(timeout=1), RuntimeError)
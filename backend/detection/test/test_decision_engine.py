@@ -0,0 +1,81 @@
+import pytest
+
+from detection.service.decision_engine import FAIL, PASS, PENDING, STABLE_FRAMES, DecisionEngine
+
+
+@pytest.fixture
+def frame(make_detections):
+    """Detections of one frame with one box per label ("bracket" or "fastener") at the given confidence."""
+    def build(bracket=None, fastener=None):
+        rows = [(0, 0, 10, 10, confidence, class_id)
+                for class_id, confidence in enumerate((bracket, fastener)) if confidence is not None]
+        return make_detections(*rows)
+    return build
+
+
+def test_verdict_is_pending_until_enough_frames(frame):
+    engine = DecisionEngine("bracket", window=4)
+    assert engine.observe(frame(bracket=0.9), now=100.0) == PENDING
+    assert engine.observe(frame(bracket=0.9), now=100.1) == PASS
+
+
+def test_target_presence_switches_with_hysteresis(frame):
+    engine = DecisionEngine("bracket", window=4)
+    for _ in range(4):
+        engine.observe(frame(bracket=0.9), now=100.0)
+    assert engine.target_present
+
+    # Score 0.675, then 0.45: below the enter threshold but above the exit one, so still present
+    engine.observe(frame(), now=100.0)
+    engine.observe(frame(), now=100.0)
+    assert engine.target_present
+    # Score 0.225: below the exit threshold
+    engine.observe(frame(), now=100.0)
+    assert not engine.target_present
+    assert engine.verdict == FAIL
+
+    # Back up to 0.45: above the exit threshold but not the enter one, so still absent
+    engine.observe(frame(bracket=0.9), now=100.0)
+    engine.observe(frame(bracket=0.9), now=100.0)
+    assert not engine.target_present
+
+
+def test_foreign_piece_fails_the_verdict(frame):
+    engine = DecisionEngine("bracket", window=4)
+    for _ in range(4):
+        verdict = engine.observe(frame(bracket=0.9, fastener=0.8), now=100.0)
+    assert verdict == FAIL
+    assert engine.foreign_present
+
+
+def test_single_missed_frame_does_not_flip_the_verdict(frame):
+    engine = DecisionEngine("bracket", window=8)
+    for _ in range(8):
+        engine.observe(frame(bracket=0.9), now=100.0)
+    assert engine.observe(frame(), now=100.0) == PASS
+
+
+def test_stable_verdict_holds_inference_until_the_hold_expires(frame):
+    engine = DecisionEngine("bracket", window=4, hold=5.0)
+    for index in range(STABLE_FRAMES + 1):
+        assert engine.should_infer(now=100.0 + index)
+        engine.observe(frame(bracket=0.9), now=100.0 + index)
+    assert engine.stable
+    stable_since = 100.0 + STABLE_FRAMES
+
+    assert not engine.should_infer(now=stable_since + 1.0)
+    assert engine.should_infer(now=stable_since + 5.0)
+    # The re-check needs a new streak before the next hold
+    assert engine.should_infer(now=stable_since + 5.1)
+
+
+def test_end_hold_resumes_inference_and_keeps_the_window(frame):
+    engine = DecisionEngine("bracket", window=4, hold=5.0)
+    for index in range(STABLE_FRAMES + 1):
+        engine.observe(frame(bracket=0.9), now=100.0 + index)
+    assert not engine.should_infer(now=104.0)
+
+    engine.end_hold()
+    assert engine.should_infer(now=104.0)
+    assert engine.verdict == PASS
+    assert engine.observe(frame(), now=104.0) == PASS
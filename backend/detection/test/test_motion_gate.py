@@ -0,0 +1,90 @@
+import time
+
+import numpy as np
+import pytest
+
+from detection.service.motion_gate import MotionGate, clip_roi, parse_roi
+
+
+def test_parse_roi():
+    assert parse_roi(None) is None
+    assert parse_roi("") is None
+    assert parse_roi("10,20,300,200") == (10, 20, 300, 200)
+    with pytest.raises(ValueError):
+        parse_roi("10,20,300")
+    with pytest.raises(ValueError):
+        parse_roi("10,20,0,200")
+
+
+def test_clip_roi_inside_the_frame():
+    frame = np.zeros((480, 640, 3), np.uint8)
+    assert clip_roi(frame, (10, 20, 100, 50)).shape == (50, 100, 3)
+
+
+def test_clip_roi_reaching_past_the_frame_is_clipped():
+    frame = np.zeros((480, 640, 3), np.uint8)
+    assert clip_roi(frame, (600, 400, 100, 200)).shape == (80, 40, 3)
+
+
+def test_clip_roi_outside_the_frame_is_none():
+    frame = np.zeros((480, 640, 3), np.uint8)
+    assert clip_roi(frame, (700, 0, 100, 100)) is None
+    assert clip_roi(frame, (0, 480, 100, 100)) is None
+
+
+def test_gate_with_roi_outside_the_frame_watches_the_whole_frame():
+    gate = MotionGate(roi=(2000, 2000, 100, 100))
+    frame = np.zeros((480, 640, 3), np.uint8)
+    assert gate.changed(frame)
+    gate.accept(frame)
+    assert not gate.changed(frame)
+
+    moved = frame.copy()
+    moved[100:300, 100:300] = 255
+    assert gate.changed(moved)
+
+
+def test_change_outside_the_roi_is_ignored():
+    gate = MotionGate(roi=(0, 0, 200, 200))
+    frame = np.zeros((480, 640, 3), np.uint8)
+    gate.changed(frame)
+    gate.accept(frame)
+
+    moved = frame.copy()
+    moved[300:480, 400:640] = 255
+    assert not gate.changed(moved)
+    moved[50:150, 50:150] = 255
+    assert gate.changed(moved)
+    assert not gate.refreshed
+
+
+def test_change_is_reported_until_the_model_runs():
+    gate = MotionGate()
+    empty = np.zeros((480, 640, 3), np.uint8)
+    gate.changed(empty)
+    gate.accept(empty)
+
+    # A piece slides in over several frames while the model is busy and skips them
+    for offset in (0, 100, 200):
+        sliding = empty.copy()
+        sliding[100:300, offset:offset + 200] = 255
+        assert gate.changed(sliding)
+    # The settled frame still differs from the last frame the model ran on
+    assert gate.changed(sliding)
+    gate.accept(sliding)
+    assert not gate.changed(sliding.copy())
+
+
+def test_refresh_is_flagged_once_per_interval():
+    gate = MotionGate(refresh_interval=0.05)
+    frame = np.zeros((120, 160, 3), np.uint8)
+    gate.changed(frame)
+    gate.accept(frame)
+    assert not gate.changed(frame)
+
+    time.sleep(0.06)
+    assert gate.changed(frame)
+    assert gate.refreshed
+    # Skipped by the model or not, the refresh is not repeated on the next frame
+    assert not gate.changed(frame)
+    assert not gate.refreshed
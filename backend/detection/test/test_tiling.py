@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from detection.service.tiling import TilingConfig, merge_tiles, split_tiles, tile_grid
+
+
+def test_tile_grid_covers_the_frame_with_overlap():
+    config = TilingConfig(tile_size=640, overlap=0.2, max_tiles=16, full_frame=False)
+    tiles = tile_grid((1080, 1920), config)
+    assert all(x2 - x1 == 640 and y2 - y1 == 640 for x1, y1, x2, y2 in tiles)
+    assert max(x2 for _, _, x2, _ in tiles) == 1920
+    assert max(y2 for _, _, _, y2 in tiles) == 1080
+    xs = sorted({x1 for x1, _, _, _ in tiles})
+    assert all(later - earlier < 640 for earlier, later in zip(xs, xs[1:]))
+
+
+def test_tile_grid_grows_tiles_to_fit_the_budget():
+    config = TilingConfig(tile_size=256, overlap=0.2, max_tiles=4, full_frame=True)
+    tiles = tile_grid((1080, 1920), config)
+    # One tile of the budget goes to the whole-frame pass
+    assert len(tiles) <= 3
+    assert max(x2 for _, _, x2, _ in tiles) == 1920
+
+
+def test_split_tiles_adds_the_whole_frame_last():
+    frame = np.zeros((1000, 1800, 3), np.uint8)
+    tiles, regions = split_tiles(frame, TilingConfig(tile_size=1000, overlap=0.2, full_frame=True))
+    assert regions[-1] == (0, 0, 1800, 1000)
+    assert tiles[-1] is frame
+    assert [tile.shape[:2] for tile in tiles[:-1]] == [(1000, 1000)] * (len(tiles) - 1)
+
+
+def test_config_rejects_invalid_values():
+    with pytest.raises(ValueError):
+        TilingConfig(tile_size=0)
+    with pytest.raises(ValueError):
+        TilingConfig(tile_size=640, overlap=1.0)
+
+
+REGIONS = [(0, 0, 1000, 1000), (800, 0, 1800, 1000)]
+
+
+def test_piece_cut_by_a_seam_is_rejoined(make_detections):
+    merged = merge_tiles([
+        make_detections((900, 10, 1000, 60, 0.9, 0)),  # reaches the right edge of the first tile
+        make_detections((0, 10, 300, 60, 0.7, 0)),     # 800..1100 in the frame, from the left edge of the second
+    ], REGIONS)
+    assert len(merged) == 1
+    assert merged.boxes[0].tolist() == [800, 10, 1100, 60]
+
+
+def test_neighbouring_pieces_of_one_class_are_not_fused(make_detections):
+    merged = merge_tiles([
+        make_detections((100, 100, 130, 130, 0.8, 0), (132, 100, 162, 130, 0.8, 0), (110, 105, 125, 125, 0.6, 0)),
+        make_detections(),
+    ], REGIONS)
+    # The small box lies inside the first one, but away from any seam it is a neighbour, not a half
+    assert len(merged) == 3
+
+
+def test_seam_halves_of_different_classes_are_kept_apart(make_detections):
+    merged = merge_tiles([
+        make_detections((900, 10, 1000, 60, 0.9, 0)),
+        make_detections((0, 10, 300, 60, 0.7, 1)),
+    ], REGIONS)
+    assert len(merged) == 2
+
+
+def test_whole_frame_pass_uses_iou_nms(make_detections):
+    merged = merge_tiles([
+        make_detections((900, 10, 1000, 60, 0.9, 0), (100, 100, 130, 130, 0.8, 0), (132, 100, 162, 130, 0.8, 0)),
+        make_detections((0, 10, 300, 60, 0.7, 0)),
+        # The same cut piece seen whole, and a coarse box spanning both small pieces
+        make_detections((890, 8, 1100, 62, 0.6, 0), (95, 95, 170, 135, 0.6, 0)),
+    ], REGIONS + [(0, 0, 1800, 1000)])
+    boxes = merged.boxes.tolist()
+    assert [800, 10, 1100, 60] in boxes
+    assert [100, 100, 130, 130] in boxes and [132, 100, 162, 130] in boxes
+    # Low IoU with either small piece: kept rather than swallowing them
+    assert [95, 95, 170, 135] in boxes
+    assert len(merged) == 4
+
+
+def test_merge_of_empty_tiles_is_empty(make_detections):
+    assert len(merge_tiles([make_detections(), make_detections()], REGIONS)) == 0
@@ -0,0 +1,85 @@
+from detection.service.tracker import MAX_MISSES, MIN_HITS, PieceTracker
+
+
+def test_track_is_reported_only_once_confirmed(make_detections):
+    tracker = PieceTracker()
+    assert len(tracker.update(make_detections((100, 100, 150, 150, 0.9, 0)), 0.0)) == 0
+
+    for step in range(1, MIN_HITS):
+        result = tracker.update(make_detections((100 + step, 100, 150 + step, 150, 0.9, 0)), step * 0.1)
+    assert len(result) == 1
+    assert result.track_ids.tolist() == [1]
+
+
+def test_low_confidence_detection_never_starts_a_track(make_detections):
+    tracker = PieceTracker()
+    for step in range(MIN_HITS + 1):
+        tracker.update(make_detections((100, 100, 150, 150, 0.3, 0)), step * 0.1)
+    assert tracker.tracks == []
+
+
+def test_low_confidence_detection_keeps_an_existing_track_alive(make_detections):
+    tracker = PieceTracker()
+    for step in range(MIN_HITS):
+        tracker.update(make_detections((100, 100, 150, 150, 0.9, 0)), step * 0.1)
+
+    # Second pass: the weak box is matched to the track the strong pass left unmatched
+    result = tracker.update(make_detections((300, 300, 350, 350, 0.9, 0), (101, 100, 151, 150, 0.3, 0)), 0.3)
+    track = next(track for track in tracker.tracks if track.track_id == 1)
+    assert track.misses == 0
+    assert track.hits == MIN_HITS + 1
+    assert result.track_ids.tolist() == [1]
+    assert len(tracker.tracks) == 2
+
+
+def test_association_follows_position_not_detection_order(make_detections):
+    tracker = PieceTracker()
+    left, right = (100, 100, 150, 150), (300, 100, 350, 150)
+    for step in range(MIN_HITS):
+        tracker.update(make_detections((*left, 0.9, 0), (*right, 0.9, 1)), step * 0.1)
+    ids = {track.class_id: track.track_id for track in tracker.tracks}
+
+    result = tracker.update(make_detections((302, 100, 352, 150, 0.9, 1), (102, 100, 152, 150, 0.9, 0)), 0.2)
+    assert len(result) == 2
+    for box, class_id, track_id in zip(result.boxes, result.class_ids.tolist(), result.track_ids.tolist()):
+        assert ids[class_id] == track_id
+        assert (box[0] < 200) == (class_id == 0)
+
+
+def test_confirmed_track_survives_max_misses_then_is_dropped(make_detections):
+    tracker = PieceTracker()
+    for step in range(MIN_HITS):
+        tracker.update(make_detections((100, 100, 150, 150, 0.9, 0)), step * 0.1)
+
+    timestamp = MIN_HITS * 0.1
+    for _ in range(MAX_MISSES):
+        assert len(tracker.update(make_detections(), timestamp)) == 1
+        timestamp += 0.1
+    assert len(tracker.update(make_detections(), timestamp)) == 0
+    assert tracker.tracks == []
+
+
+def test_unconfirmed_track_is_dropped_on_its_first_miss(make_detections):
+    tracker = PieceTracker()
+    tracker.update(make_detections((100, 100, 150, 150, 0.9, 0)), 0.0)
+    tracker.update(make_detections(), 0.1)
+    assert tracker.tracks == []
+
+
+def test_unconfirmed_track_is_unsettled_until_confirmed(make_detections):
+    tracker = PieceTracker()
+    assert not tracker.unsettled(0.0)
+    tracker.update(make_detections((100, 100, 150, 150, 0.9, 0)), 0.0)
+    assert tracker.unsettled(0.05)
+
+    for step in range(1, MIN_HITS):
+        tracker.update(make_detections((100, 100, 150, 150, 0.9, 0)), step * 0.1)
+    assert not tracker.unsettled(MIN_HITS * 0.1)
+
+
+def test_track_without_detections_becomes_unsettled(make_detections):
+    tracker = PieceTracker()
+    for step in range(MIN_HITS):
+        tracker.update(make_detections((100, 100, 150, 150, 0.9, 0)), step * 0.1)
+    # The predicted position spreads the longer the model does not run
+    assert tracker.unsettled(60.0)
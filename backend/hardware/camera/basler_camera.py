@@ -1,12 +1,11 @@
 import cv2
 from typing import Dict, List
-import win32com.client
 from pypylon import pylon
 import threading
 import time
 import numpy as np
 
-from hardware.camera.external_camera import get_available_cameras, get_usb_devices
+from hardware.camera.external_camera import get_available_cameras
 
 
 # Function to resize an image while maintaining aspect ratio
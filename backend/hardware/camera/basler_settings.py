@@ -0,0 +1,215 @@
+from typing import Dict, Optional
+
+try:
+    from pypylon import genicam
+except ImportError:  # Only needed once a Basler camera is actually opened
+    genicam = None
+
+
+# CameraSettings column -> Basler node name, in the order they must be applied:
+# binning and decimation change the maximum Width/Height, and the offsets are
+# only valid once the final Width/Height are set.
+SENSOR_NODES = [
+    ("binning_horizontal", "BinningHorizontal"),
+    ("binning_vertical", "BinningVertical"),
+    ("decimation_horizontal", "DecimationHorizontal"),
+    ("decimation_vertical", "DecimationVertical"),
+    ("width", "Width"),
+    ("height", "Height"),
+    ("offset_x", "OffsetX"),
+    ("offset_y", "OffsetY"),
+]
+
+
+def set_integer_node(node_map, name: str, value: int) -> Optional[int]:
+    """
+    Set an integer node, clamped to its range and rounded down to its increment.
+    Returns the value the camera actually holds, or None if the node is missing or not writable.
+    """
+    try:
+        node = node_map.GetNode(name)
+    except genicam.GenericException:
+        return None
+    if node is None or not genicam.IsWritable(node):
+        print(f"Basler node {name} is not available on this camera.")
+        return None
+
+    minimum, maximum, increment = node.GetMin(), node.GetMax(), node.GetInc()
+    value = max(minimum, min(int(value), maximum))
+    value = minimum + ((value - minimum) // increment) * increment
+    node.SetValue(value)
+    return node.GetValue()
+
+
+def apply_sensor_settings(camera, settings) -> Dict[str, int]:
+    """
+    Apply the ROI, binning and decimation stored in `settings` (a CameraSettings row)
+    to an open Basler camera. Must be called while the camera is not grabbing.
+    Returns the values actually applied, keyed by CameraSettings column.
+    """
+    applied = {}
+    if settings is None:
+        return applied
+
+    node_map = camera.GetNodeMap()
+    requested = {column: getattr(settings, column, None) for column, _ in SENSOR_NODES}
+    if not any(value is not None for value in requested.values()):
+        return applied
+
+    # Reset the offsets first so that a larger Width/Height is not rejected
+    if requested["width"] is not None or requested["height"] is not None:
+        set_integer_node(node_map, "OffsetX", 0)
+        set_integer_node(node_map, "OffsetY", 0)
+
+    for column, node_name in SENSOR_NODES:
+        value = requested[column]
+        if value is None:
+            continue
+        actual = set_integer_node(node_map, node_name, value)
+        if actual is not None:
+            applied[column] = actual
+
+    print(f"Applied Basler sensor settings: {applied}")
+    return applied
+
+
+def set_enum_node(node_map, name: str, value: str) -> Optional[str]:
+    """Set an enumeration node if the camera supports `value`; returns the value the camera holds."""
+    try:
+        node = node_map.GetNode(name)
+        if node is None or not genicam.IsWritable(node):
+            print(f"Basler node {name} is not available on this camera.")
+            return None
+        entry = node.GetEntryByName(value)
+        if entry is None or not genicam.IsAvailable(entry):
+            print(f"Basler node {name} does not support value {value}.")
+            return None
+        node.FromString(value)
+        return node.ToString()
+    except genicam.GenericException as e:
+        print(f"Failed to set Basler node {name} to {value}: {e}")
+        return None
+
+
+def apply_trigger_settings(camera, settings) -> str:
+    """
+    Configure the FrameStart trigger from `settings.trigger_mode`:
+    "off" keeps the camera free-running, "software" waits for ExecuteSoftwareTrigger(),
+    "hardware" waits for an edge on `settings.trigger_source` (Line1 by default).
+    Must be called while the camera is not grabbing. Returns the mode actually applied.
+    """
+    node_map = camera.GetNodeMap()
+    mode = (getattr(settings, "trigger_mode", None) or "off").lower()
+
+    set_enum_node(node_map, "TriggerSelector", "FrameStart")
+    if mode not in ("software", "hardware"):
+        set_enum_node(node_map, "TriggerMode", "Off")
+        return "off"
+
+    if mode == "software":
+        source = set_enum_node(node_map, "TriggerSource", "Software")
+    else:
+        source = set_enum_node(node_map, "TriggerSource", getattr(settings, "trigger_source", None) or "Line1")
+        set_enum_node(node_map, "TriggerActivation", getattr(settings, "trigger_activation", None) or "RisingEdge")
+
+    if source is None or set_enum_node(node_map, "TriggerMode", "On") is None:
+        print(f"Trigger mode {mode} could not be configured, falling back to free-running acquisition.")
+        set_enum_node(node_map, "TriggerMode", "Off")
+        return "off"
+    return mode
+
+
+def enable_chunks(camera) -> bool:
+    """
+    Ask the camera to append its timestamp and frame counter to every image as chunk data.
+    Must be called while the camera is not grabbing. Returns False if chunks are unsupported.
+    """
+    node_map = camera.GetNodeMap()
+    try:
+        # One chunk node map per grab buffer, created up front instead of in StartGrabbing()
+        camera.StaticChunkNodeMapPoolSize = camera.MaxNumBuffer.GetValue()
+        active = node_map.GetNode("ChunkModeActive")
+        if active is None or not genicam.IsWritable(active):
+            return False
+        active.SetValue(True)
+    except genicam.GenericException as e:
+        print(f"Chunk data is not supported by this camera: {e}")
+        return False
+
+    # GigE cameras name the counter chunk "Framecounter", USB cameras "CounterValue"
+    for selector in ("Timestamp", "Framecounter", "CounterValue"):
+        if set_enum_node(node_map, "ChunkSelector", selector) is not None:
+            node_map.GetNode("ChunkEnable").SetValue(True)
+    return True
+
+
+def read_chunk_info(grab_result) -> Dict[str, int]:
+    """Return the camera timestamp and frame counter of a grab result, from chunk data when available."""
+    info = {}
+    try:
+        info["camera_timestamp"] = grab_result.ChunkTimestamp.Value
+    except Exception:
+        info["camera_timestamp"] = grab_result.GetTimeStamp()
+
+    for chunk in ("ChunkFramecounter", "ChunkCounterValue"):
+        try:
+            info["frame_counter"] = getattr(grab_result, chunk).Value
+            break
+        except Exception:
+            continue
+    else:
+        info["frame_counter"] = grab_result.GetImageNumber()
+    return info
+
+
+# UpdateCameraSettings field -> Basler float node, for settings that can change while grabbing
+FLOAT_NODES = {
+    "exposure": "ExposureTime",
+    "gain": "Gain",
+    "frame_rate": "AcquisitionFrameRate",
+}
+
+# Settings that change the image geometry or the trigger and need grabbing to be stopped
+RESTART_SETTINGS = {column for column, _ in SENSOR_NODES} | {"trigger_mode", "trigger_source", "trigger_activation"}
+
+
+def set_float_node(node_map, name: str, value: float) -> Optional[float]:
+    """Set a float node clamped to its range; returns the value the camera actually holds."""
+    try:
+        node = node_map.GetNode(name)
+        if node is None or not genicam.IsWritable(node):
+            print(f"Basler node {name} is not available on this camera.")
+            return None
+        node.SetValue(max(node.GetMin(), min(float(value), node.GetMax())))
+        return node.GetValue()
+    except genicam.GenericException as e:
+        print(f"Failed to set Basler node {name} to {value}: {e}")
+        return None
+
+
+def apply_live_settings(camera, updates: Dict) -> Dict:
+    """
+    Apply exposure, gain, frame rate and white balance to an open (possibly grabbing) Basler camera.
+    `white_balance` is a BalanceWhiteAuto value ("Off", "Once" or "Continuous").
+    Returns the values actually applied, keyed by CameraSettings column.
+    """
+    node_map = camera.GetNodeMap()
+    applied = {}
+    for column, node_name in FLOAT_NODES.items():
+        value = updates.get(column)
+        if value is None:
+            continue
+        if column == "frame_rate":
+            try:
+                node_map.GetNode("AcquisitionFrameRateEnable").SetValue(True)
+            except genicam.GenericException:
+                pass
+        actual = set_float_node(node_map, node_name, value)
+        if actual is not None:
+            applied[column] = actual
+
+    if updates.get("white_balance") is not None:
+        actual = set_enum_node(node_map, "BalanceWhiteAuto", str(updates["white_balance"]))
+        if actual is not None:
+            applied["white_balance"] = actual
+    return applied
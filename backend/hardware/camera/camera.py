@@ -1,10 +1,15 @@
 
 import os
 import threading
-from pypylon import pylon
+import time
+try:
+    from pypylon import pylon
+except ImportError:  # pylon SDK not installed (e.g. Linux inference nodes): Basler cameras are unavailable
+    pylon = None
 from sqlalchemy import func
-from typing import Dict, Generator, List, Optional, Tuple
+from typing import Dict, Generator, List, Optional, Set, Tuple
 import cv2
+import numpy as np
 from fastapi import HTTPException
 
 from sqlalchemy.orm import Session
@@ -12,13 +17,47 @@ from api.camera.models.camera_settings import UpdateCameraSettings
 
 from database.piece.piece import Piece
 from database.piece.piece_image import PieceImage
-from hardware.camera.external_camera import get_available_cameras
+from hardware.camera.external_camera import camera_fingerprint, enumerate_available_cameras
+from hardware.camera.camera_providers import registry_types
+from hardware.camera.frame_buffer import FrameBuffer
+from hardware.camera.replay_capture import ReplayCapture
+from hardware.camera.basler_settings import (
+    RESTART_SETTINGS,
+    apply_live_settings,
+    apply_sensor_settings,
+    apply_trigger_settings,
+    enable_chunks,
+    read_chunk_info,
+)
 from database.camera.camera_settings import CameraSettings
 from database.camera.camera import Camera
 from datetime import datetime
 import asyncio
 stop_event = asyncio.Event()
 
+# Number of reusable converter output images kept per Basler camera
+BASLER_CONVERTER_POOL_SIZE = 2
+
+# CameraSettings column -> OpenCV capture property, for live changes on regular cameras
+OPENCV_PROPERTIES = {
+    "brightness": cv2.CAP_PROP_BRIGHTNESS,
+    "contrast": cv2.CAP_PROP_CONTRAST,
+    "exposure": cv2.CAP_PROP_EXPOSURE,
+    "white_balance": cv2.CAP_PROP_WHITE_BALANCE_BLUE_U,
+    "focus": cv2.CAP_PROP_FOCUS,
+    "aperture": cv2.CAP_PROP_APERTURE,
+    "gain": cv2.CAP_PROP_GAIN,
+    "width": cv2.CAP_PROP_FRAME_WIDTH,
+    "height": cv2.CAP_PROP_FRAME_HEIGHT,
+    "frame_rate": cv2.CAP_PROP_FPS,
+}
+
+# CameraSettings column -> ReplayCapture attribute
+REPLAY_ATTRIBUTES = {
+    "replay_jitter_ms": "jitter_ms",
+    "replay_drop_rate": "drop_rate",
+}
+
 class FrameSource:
     """
     Allows capturing images from a camera frame-by-frame.
@@ -33,30 +72,54 @@ class FrameSource:
         self.basler_camera = None
         self.type= None
         self.confidence_threshold = 0.5  # Set the confidence threshold
-        self.converter = pylon.ImageFormatConverter()
-        self.converter.OutputPixelFormat = pylon.PixelType_BGR8packed
-        self.converter.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
+        self.converter = None  # Created when a Basler camera is started
+        # Frames are grabbed on a dedicated thread into a ring buffer so that
+        # slow consumers (inference, encoding) never stall acquisition.
+        self.frame_buffer = FrameBuffer(size=4)
+        self._grab_thread = None
+        self._grab_stop = threading.Event()
+        self._device_lock = threading.Lock()  # Serialises OpenCV reads with live property changes
+        self._reconfiguring = threading.Event()  # Set while Basler grabbing is paused for a settings change
+        self._frame_counter = 0  # Host-side frame counter for cameras without chunk data
+        self.trigger_mode = "off"
     # Reset virtual_storage whenever needed
 
 
     def _check_camera(self):
         return self.capture.isOpened()
 
-    def detect_and_save_cameras(self, db: Session):
-        available_cameras = get_available_cameras()  # Use the updated function
+    def detect_and_save_cameras(self, db: Session, available_cameras: Optional[List[Dict]] = None,
+                                answered_providers: Optional[Set[str]] = None):
+        """
+        Register the connected cameras. Devices whose fingerprint is already in the database
+        are only marked as connected; only new or changed devices are opened and probed.
+        Only cameras of the providers that answered the enumeration are marked as unplugged.
+        """
+        if available_cameras is None:
+            available_cameras, answered_providers = enumerate_available_cameras()
+        if answered_providers is None:
+            answered_providers = {camera.get("provider") for camera in available_cameras}
         print("Available Cameras:", available_cameras)
 
-        for camera in available_cameras:
+        now = datetime.now()
+        fingerprints = {camera_fingerprint(camera): camera for camera in available_cameras}
+        known = {
+            registered.fingerprint: registered
+            for registered in db.query(Camera).filter(Camera.fingerprint.in_(list(fingerprints))).all()
+        }
+
+        for fingerprint, camera in fingerprints.items():
+            registered = known.get(fingerprint) or self._match_unfingerprinted(db, camera)
+            if registered is not None:
+                registered.fingerprint = fingerprint
+                registered.connected = True
+                registered.last_seen = now
+                continue
+
             if camera['type'] == 'basler':
                 # Handle Basler camera
                 print(f"Detected Basler Camera: {camera['caption']}")
-                
-                # Assume `device` contains necessary Basler information
-                basler_info = {
-                    "type": "basler",
-                    "caption": camera['caption'],
-                    "device_details": str(camera['device'])  # Convert to string for saving if needed
-                }
+
                 # Pass the correct camera type and other details
                 camera_info = self.get_camera_info(camera_index=None,
                                                    serial_number=None,  # Basler cameras might not use index
@@ -64,38 +127,67 @@ class FrameSource:
                                                     camera_type='basler', 
                                                     device=camera['device'])
                 if camera_info:
+                    camera_info['fingerprint'] = fingerprint
                     print(camera_info)
                     self.save_camera_info(db, camera_info)
 
             elif camera['type'] == 'opencv':
-                # Handle OpenCV-compatible camera
+                # Handle OpenCV-compatible camera; get_camera_info fails if the device cannot be opened
                 index = camera.get('index')
-                capture = cv2.VideoCapture(index)
+                print(f"Detected OpenCV Camera: {camera['caption']}")
 
-                if capture.isOpened():
-                    print(f"Detected OpenCV Camera: {camera['caption']}")
-
-                    # Pass the correct camera type
-                    camera_info = self.get_camera_info(camera_index=index, 
-                                                       serial_number=None,
-                                                    model_name=camera['caption'], 
-                                                    camera_type='regular')
-                    if camera_info:
-                        print(camera_info)
-                        self.save_camera_info(db, camera_info)
-
-                    capture.release()
+                # Pass the correct camera type
+                camera_info = self.get_camera_info(camera_index=index, 
+                                                   serial_number=None,
+                                                model_name=camera['caption'], 
+                                                camera_type='regular')
+                if camera_info:
+                    camera_info['fingerprint'] = fingerprint
+                    print(camera_info)
+                    self.save_camera_info(db, camera_info)
                 else:
                     print(f"Failed to open OpenCV Camera at index {index}")
-                    continue
+
+            elif camera['type'] == 'replay':
+                # File-backed camera found by the file provider
+                print(f"Detected Replay Camera: {camera['caption']}")
+                camera_info = self.get_camera_info(camera_index=None,
+                                                   serial_number=None,
+                                                   model_name=camera['caption'],
+                                                   camera_type='replay',
+                                                   source_path=camera['source'])
+                if camera_info:
+                    camera_info['fingerprint'] = fingerprint
+                    self.save_camera_info(db, camera_info)
+
+        # Anything registered but not enumerated any more by a provider that answered has been unplugged;
+        # the cameras of a provider that timed out or failed keep their state
+        db.query(Camera).filter(
+            Camera.connected == True,  # noqa: E712
+            Camera.camera_type.in_(list(registry_types(answered_providers))),
+            ~Camera.fingerprint.in_(list(fingerprints)),
+        ).update({Camera.connected: False}, synchronize_session=False)
+        db.commit()
 
         return available_cameras
 
+    @staticmethod
+    def _match_unfingerprinted(db: Session, camera: Dict) -> Optional[Camera]:
+        """Find a camera registered before fingerprints existed, so it is not probed again."""
+        query = db.query(Camera).filter(Camera.fingerprint == None)  # noqa: E711
+        if camera['type'] == 'basler':
+            return query.filter(Camera.serial_number == camera.get('serial_number')).first()
+        if camera['type'] == 'replay':
+            return query.filter(Camera.source_path == camera.get('source')).first()
+        return query.filter(Camera.camera_type == 'regular',
+                            Camera.camera_index == camera.get('index'),
+                            Camera.model == camera['caption']).first()
+
 
     @staticmethod
-    def get_camera_info(camera_index: Optional[int],serial_number:Optional[str], model_name: str, camera_type: str, device: Optional[pylon.DeviceInfo] = None) -> Optional[Dict]:
+    def get_camera_info(camera_index: Optional[int],serial_number:Optional[str], model_name: str, camera_type: str, device: Optional["pylon.DeviceInfo"] = None, source_path: Optional[str] = None) -> Optional[Dict]:
         """
-        Retrieve or apply default camera settings based on the camera type (regular or Basler).
+        Retrieve or apply default camera settings based on the camera type (regular, Basler or replay).
         """
         try:
             if camera_type == "regular":
@@ -165,6 +257,17 @@ class FrameSource:
 
                 finally:
                     camera.Close()
+            elif camera_type == "replay" and source_path:
+                # For file-backed cameras: replay at the file's own frame rate by default
+                capture = cv2.VideoCapture(source_path) if os.path.isfile(source_path) else None
+                frame_rate = capture.get(cv2.CAP_PROP_FPS) if capture is not None and capture.isOpened() else 0
+                return {
+                    "camera_type": "replay",
+                    "serial_number": None,
+                    "source_path": source_path,
+                    "model": model_name,
+                    "settings": {"frame_rate": frame_rate or 25.0},
+                }
             else:
                 raise ValueError(f"Unsupported camera type: {camera_type}")
 
@@ -173,7 +276,7 @@ class FrameSource:
             return None
 
         finally:
-            if 'capture' in locals() and capture.isOpened():
+            if 'capture' in locals() and capture is not None and capture.isOpened():
                 capture.release()
 
 
@@ -182,9 +285,18 @@ class FrameSource:
         # Check if serial_number exists in camera_info
         serial_number = camera_info.get('serial_number', 'Unknown')
 
-        existing_camera = db.query(Camera).filter(Camera.serial_number == serial_number).first()
+        if serial_number is not None:
+            existing_camera = db.query(Camera).filter(Camera.serial_number == serial_number).first()
+        else:
+            # Replay cameras have no serial number; their source file identifies them
+            existing_camera = db.query(Camera).filter(Camera.source_path == camera_info.get('source_path')).first()
         if existing_camera:
             print(f"Camera with serial number {serial_number} already registered.")
+            if camera_info.get('fingerprint'):
+                existing_camera.fingerprint = camera_info['fingerprint']
+                existing_camera.connected = True
+                existing_camera.last_seen = datetime.now()
+                db.commit()
             return existing_camera
 
         # Create CameraSettings object
@@ -196,6 +308,9 @@ class FrameSource:
             aperture=camera_info['settings'].get('aperture'),
             gain=camera_info['settings'].get('gain'),
             white_balance=camera_info['settings'].get('white_balance'),
+            frame_rate=camera_info['settings'].get('frame_rate'),
+            replay_jitter_ms=camera_info['settings'].get('replay_jitter_ms'),
+            replay_drop_rate=camera_info['settings'].get('replay_drop_rate'),
         )
         db.add(settings)
         db.commit()
@@ -206,8 +321,12 @@ class FrameSource:
             camera_type=camera_info['camera_type'],
             camera_index=camera_info.get('camera_index'),
             serial_number=serial_number,
+            source_path=camera_info.get('source_path'),
             model=camera_info['model'],
             status=False,
+            fingerprint=camera_info.get('fingerprint'),
+            connected=True,
+            last_seen=datetime.now(),
             settings_id=settings.id,
         )
         db.add(camera)
@@ -217,11 +336,13 @@ class FrameSource:
         print(f"Camera with serial number {serial_number} registered successfully!")
         return camera
 
-    def get_camera_by_index(self, camera_id, db: Session):
+    @staticmethod
+    def get_camera_by_index(camera_id, db: Session):
        
         return db.query(Camera).filter(Camera.id == camera_id).first()
 
-    def get_camera_model_and_ids(self, db: Session) -> List[Tuple[int, str]]:
+    @staticmethod
+    def get_camera_model_and_ids(db: Session) -> List[Tuple[int, str]]:
 
         return db.query(Camera.id, Camera.model).all()
     
@@ -249,9 +370,25 @@ class FrameSource:
             self.type = "regular"
             print(f"Camera with index {camera.camera_index} started successfully.")
 
+        elif camera.camera_type == "replay":
+            # File-backed camera, paced like a real one; read through the same path as OpenCV cameras
+            settings = db.query(CameraSettings).filter(CameraSettings.id == camera.settings_id).first()
+            self.capture = ReplayCapture(
+                camera.source_path,
+                fps=settings.frame_rate if settings else 25.0,
+                jitter_ms=settings.replay_jitter_ms if settings else 0.0,
+                drop_rate=settings.replay_drop_rate if settings else 0.0,
+            )
+            if not self._check_camera():
+                raise SystemError(f"Replay source {camera.source_path} has no frames.")
+            self.type = "replay"
+            print(f"Replay camera {camera.source_path} started successfully.")
+
         elif camera.camera_type == "basler":
             # For Basler cameras
             print(f"Attempting to start Basler camera with serial number: {camera.serial_number}")
+            if pylon is None:
+                raise SystemError("pypylon is not installed; Basler cameras are unavailable on this machine.")
 
             try:
                 device_info = pylon.DeviceInfo()
@@ -261,16 +398,28 @@ class FrameSource:
                 # Create and open the Basler camera
                 self.basler_camera = pylon.InstantCamera(pylon.TlFactory.GetInstance().CreateDevice(device_info))
                 self.basler_camera.Open()
+
+                # Crop/bin on the sensor so only the pixels we inspect are transferred
+                settings = db.query(CameraSettings).filter(CameraSettings.id == camera.settings_id).first()
+                apply_sensor_settings(self.basler_camera, settings)
+                # Timestamp every frame on the camera and optionally wait for a trigger per frame
+                enable_chunks(self.basler_camera)
+                self.trigger_mode = apply_trigger_settings(self.basler_camera, settings)
+
                 self.converter = pylon.ImageFormatConverter()
                 self.converter.OutputPixelFormat = pylon.PixelType_BGR8packed
                 self.converter.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
+                # Output buffers the converter writes into, allocated once and reused for every frame
+                self._converted_images = [pylon.PylonImage() for _ in range(BASLER_CONVERTER_POOL_SIZE)]
+                self._converted_index = 0
                 self.type = "basler"
                 print("Basler camera opened successfully.")
 
                 # Check if the camera is grabbing frames
                 if not self.basler_camera.IsGrabbing():
                     print("Starting camera grabbing...")
-                    self.basler_camera.StartGrabbing()
+                    # Only the newest image is kept in the driver queue; stale frames are dropped on the camera side
+                    self.basler_camera.StartGrabbing(pylon.GrabStrategy_LatestImageOnly)
                     print("Camera grabbing started.")
                 else:
                     print("Camera is already grabbing.")
@@ -283,15 +432,180 @@ class FrameSource:
 
         # Mark the camera as running
         self.camera_is_running = True
+        self._start_acquisition()
         print(f"Camera with ID {camera_id} started successfully.")
 
+    def _start_acquisition(self):
+        """Start the background thread that keeps the ring buffer filled."""
+        self._grab_stop.clear()
+        self.frame_buffer.reset()
+        self._grab_thread = threading.Thread(target=self._grab_loop, name=f"grab-{self.type}", daemon=True)
+        self._grab_thread.start()
+
+    def _stop_acquisition(self):
+        """Signal the acquisition thread to exit and wait for it before releasing the device."""
+        self._grab_stop.set()
+        if self._grab_thread is not None:
+            self._grab_thread.join(timeout=6)
+            self._grab_thread = None
+        self.frame_buffer.close()
+
+    def _grab_loop(self):
+        while not self._grab_stop.is_set():
+            try:
+                if self.type in ("regular", "replay"):
+                    self._grab_regular()
+                elif self.type == "basler":
+                    self._grab_basler()
+                else:
+                    break
+            except Exception as e:
+                print(f"Acquisition error: {e}")
+                time.sleep(0.05)  # Avoid spinning on a camera that keeps failing
+        self.frame_buffer.close()
+
+    def _grab_regular(self):
+        # Read straight into the next preallocated slot once the frame size is known
+        previous, _ = self.frame_buffer.latest(copy=False)
+        if previous is not None:
+            slot = self.frame_buffer.slot_for(previous.shape, previous.dtype)
+            with self._device_lock:
+                success, frame = self.capture.read(slot)
+        else:
+            with self._device_lock:
+                success, frame = self.capture.read()
+        if not success or frame is None or frame.size == 0:
+            time.sleep(0.01)
+            return
+        self._frame_counter += 1
+        if previous is not None and frame is slot:
+            self.frame_buffer.commit(frame_counter=self._frame_counter)
+        else:
+            self.frame_buffer.write(frame, frame_counter=self._frame_counter)
+
+    def _grab_basler(self):
+        if self._reconfiguring.is_set() or not self.basler_camera or not self.basler_camera.IsGrabbing():
+            time.sleep(0.01)
+            return
+        grab_result = self.basler_camera.RetrieveResult(5000, pylon.TimeoutHandling_Return)
+        try:
+            if grab_result.IsValid() and grab_result.GrabSucceeded():
+                self._store_basler_result(grab_result)
+        finally:
+            grab_result.Release()
+
+    def _store_basler_result(self, grab_result):
+        """
+        Copy a grab result into the ring buffer with a single copy.
+
+        BGR8 and Mono8 images are read through a zero-copy view onto the pylon grab
+        buffer; any other pixel format goes through the converter into a reused
+        output image instead of allocating a fresh BGR copy per frame.
+        """
+        info = read_chunk_info(grab_result)
+        pixel_type = grab_result.GetPixelType()
+        if pixel_type == pylon.PixelType_BGR8packed:
+            with grab_result.GetArrayZeroCopy() as array:
+                self.frame_buffer.write(array, **info)
+        elif pixel_type == pylon.PixelType_Mono8:
+            with grab_result.GetArrayZeroCopy() as array:
+                slot = self.frame_buffer.slot_for(array.shape + (3,))
+                cv2.cvtColor(array, cv2.COLOR_GRAY2BGR, dst=slot)
+                self.frame_buffer.commit(**info)
+        else:
+            image = self._converted_images[self._converted_index]
+            self._converted_index = (self._converted_index + 1) % len(self._converted_images)
+            self.converter.Convert(image, grab_result)
+            with image.GetArrayZeroCopy() as array:
+                self.frame_buffer.write(array, **info)
+
+    def read(self, last_seq: int = -1, timeout: float = 5.0, enhance: bool = False) -> Tuple[np.ndarray, Dict]:
+        """
+        Return a copy of the newest frame grabbed after `last_seq` together with its info
+        (`seq`, host `timestamp`, `frame_counter` and, for Basler cameras, `camera_timestamp`).
+        Pass the previous `info["seq"]` to wait for the next frame.
+        """
+        assert self.camera_is_running, "Start the camera first by calling the start() method"
+        frame, info = self.frame_buffer.wait_next(last_seq, timeout=timeout)
+        if frame is None:
+            raise SystemError("Failed to capture a frame. Ensure the camera is functioning properly.")
+        if enhance:
+            frame = self.enhance(frame)
+        return frame, info
+
+    def apply_settings(self, updates: Dict, settings: Optional[CameraSettings] = None) -> Dict:
+        """
+        Apply a batch of setting changes to the already-open device without reopening it.
+        `settings` is the full, already-updated CameraSettings row, needed for ROI and trigger changes.
+        Returns the values the device actually took, keyed by CameraSettings column.
+        """
+        assert self.camera_is_running, "Start the camera first by calling the start() method"
+        applied = {}
+
+        if self.type in ("regular", "replay"):
+            with self._device_lock:
+                if self.type == "replay":
+                    for column, attribute in REPLAY_ATTRIBUTES.items():
+                        if updates.get(column) is not None:
+                            # ReplayCapture clamps jitter and drop rate; report the value it actually took
+                            setattr(self.capture, attribute, float(updates[column]))
+                            applied[column] = getattr(self.capture, attribute)
+                for column, prop in OPENCV_PROPERTIES.items():
+                    if updates.get(column) is None:
+                        continue
+                    try:
+                        accepted = self.capture.set(prop, float(updates[column]))
+                    except (TypeError, ValueError):
+                        continue
+                    # Backends reject unsupported properties with False; only report what took effect
+                    if accepted:
+                        applied[column] = self.capture.get(prop)
+                    else:
+                        print(f"Camera {self.cam_id} rejected {column}={updates[column]}.")
+
+        elif self.type == "basler":
+            applied.update(apply_live_settings(self.basler_camera, updates))
+            if RESTART_SETTINGS.intersection(updates):
+                # Geometry and trigger nodes are locked while grabbing: pause the stream, not the device
+                self._reconfiguring.set()
+                self.basler_camera.StopGrabbing()
+                try:
+                    applied.update(apply_sensor_settings(self.basler_camera, settings))
+                    if {"trigger_mode", "trigger_source", "trigger_activation"}.intersection(updates):
+                        self.trigger_mode = apply_trigger_settings(self.basler_camera, settings)
+                        applied["trigger_mode"] = self.trigger_mode
+                finally:
+                    self.basler_camera.StartGrabbing(pylon.GrabStrategy_LatestImageOnly)
+                    self._reconfiguring.clear()
+
+        print(f"Applied live camera settings: {applied}")
+        return applied
+
+    def trigger(self, timeout: float = 5.0) -> Tuple[np.ndarray, Dict]:
+        """Fire a software trigger and return exactly the frame it produced."""
+        assert self.camera_is_running, "Start the camera first by calling the start() method"
+        if self.type != "basler" or self.trigger_mode != "software":
+            raise ValueError("Software trigger requires a Basler camera configured with trigger_mode 'software'.")
+
+        last_seq = self.frame_buffer.seq
+        if not self.basler_camera.WaitForFrameTriggerReady(int(timeout * 1000), pylon.TimeoutHandling_Return):
+            raise SystemError("Camera is not ready for a new trigger.")
+        self.basler_camera.ExecuteSoftwareTrigger()
+        return self.read(last_seq, timeout=timeout)
+
+    @staticmethod
+    def enhance(frame: np.ndarray) -> np.ndarray:
+        # Enhance the frame: adjust brightness and contrast
+        return cv2.convertScaleAbs(frame, alpha=2, beta=-50)
+
 
-   
     def stopInspection(self):
         if not self.camera_is_running:
             print("Camera is not running.")
             return
 
+        self._stop_acquisition()
+
         # Stop regular OpenCV camera (if applicable)
         if self.capture is not None:
             self.capture.release()
@@ -321,6 +635,8 @@ class FrameSource:
             print("Camera is not running.")
             return
 
+        self._stop_acquisition()
+
         # Stop regular OpenCV camera (if applicable)
         if self.capture is not None:
             self.capture.release()
@@ -351,46 +667,30 @@ class FrameSource:
     def frame(self):
         assert self.camera_is_running, "Start the camera first by calling the start() method"
 
-        success, frame = self.capture.read()
-        if not success:
-            raise SystemError("Failed to capture a frame. Ensure the camera is functioning properly.")
-        
+        frame, _ = self.frame_buffer.latest()
+        if frame is None:
+            # Nothing grabbed yet: wait for the acquisition thread's first frame
+            frame, _ = self.read()
+
         if frame is None or frame.size == 0:
             raise ValueError("Captured frame is empty or invalid.")
 
-        # Enhance the frame: adjust brightness and contrast
-        enhanced_frame = cv2.convertScaleAbs(frame,  alpha=2, beta=-50)
-
-
-        return enhanced_frame
+        return self.enhance(frame)
 
 
     def generate_frames(self) -> Generator[bytes, None, None]:
         assert self.camera_is_running, "Start the camera first by calling the start() method"
+        last_seq = -1
         while self.camera_is_running:
-            if self.type == "regular":
-                success, frame = self.capture.read()
-                if not success:
-                    break
-                _, buffer = cv2.imencode('.jpg', frame)
-                frame_bytes = buffer.tobytes()
-                yield (b'--frame\r\n'
-                    b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            elif self.type == "basler":
-                if not hasattr(self, 'converter'):
-                    raise AttributeError("Converter is not initialized for Basler camera")
-                
-                if self.basler_camera and self.basler_camera.IsGrabbing():
-                    grab_result = self.basler_camera.RetrieveResult(5000, pylon.TimeoutHandling_ThrowException)
-                    if grab_result.GrabSucceeded():
-                        image = self.converter.Convert(grab_result)
-                        frame = image.GetArray()
-                        _, buffer = cv2.imencode('.jpg', frame)
-                        yield (b'--frame\r\n'
-                            b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-                    grab_result.Release()
-                else:
+            frame, info = self.frame_buffer.wait_next(last_seq, timeout=1.0)
+            if frame is None:
+                if self.frame_buffer.closed:
                     break
+                continue
+            last_seq = info["seq"]
+            _, buffer = cv2.imencode('.jpg', frame)
+            yield (b'--frame\r\n'
+                b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
     
     
 # !TODO : change the timestamps into a counter 
@@ -411,9 +711,7 @@ class FrameSource:
         
         
 
-        success, frame = self.capture.read()
-        if not success:
-            raise SystemError("Failed to capture a frame")
+        frame, _ = self.read()
 
         # Resize the frame if needed
         frame = cv2.resize(frame, (1000, 1000))
@@ -455,9 +753,9 @@ class FrameSource:
 #instead of next_frame i used this 
     def capture_images(self, save_folder: str, url: str, piece_label: str):
         assert self.camera_is_running, "Start the camera first by calling the start() method"
-        if self.type == "regular" :
-            success, frame = self.capture.read()
-            if not success:
+        if self.type in ("regular", "replay"):
+            frame, _ = self.frame_buffer.latest()
+            if frame is None:
                 raise SystemError("Failed to capture a frame")
 
             # Resize the frame if needed
@@ -580,7 +878,7 @@ class FrameSource:
         return camera_data
         
     @staticmethod
-    def change_camera_settings(camera_id: int, camera_settings_update: UpdateCameraSettings, db: Session):
+    def change_camera_settings(camera_id: int, camera_settings_update: UpdateCameraSettings, db: Session, running_source: Optional["FrameSource"] = None):
         # Fetch the camera by its ID
         camera = db.query(Camera).filter(Camera.id == camera_id).first()
         if not camera:
@@ -591,38 +889,21 @@ class FrameSource:
         if not camera_settings:
             raise HTTPException(status_code=404, detail="Camera settings not found")
 
-        # Open the camera using OpenCV
-        capture = cv2.VideoCapture(camera_settings.cameraIndex)
-        if not capture.isOpened():
-            raise HTTPException(status_code=500, detail="Failed to open camera")
-
-
-        # Update the settings
+        updates = camera_settings_update.dict(exclude_unset=True)
+        applied = {}
         try:
-            for key, value in camera_settings_update.dict(exclude_unset=True).items():
+            for key, value in updates.items():
                 setattr(camera_settings, key, value)
 
-                if key == "brightness":
-                    capture.set(cv2.CAP_PROP_BRIGHTNESS, value)
-                elif key == "contrast":
-                    capture.set(cv2.CAP_PROP_CONTRAST, value)
-                elif key == "exposure":
-                    capture.set(cv2.CAP_PROP_EXPOSURE, value)
-                elif key == "white_balance":
-                    capture.set(cv2.CAP_PROP_WHITE_BALANCE_BLUE_U, value)
-                elif key == "focus":
-                    capture.set(cv2.CAP_PROP_FOCUS, value)
-                elif key == "aperture":
-                    capture.set(cv2.CAP_PROP_APERTURE, value)
-                elif key == "gain":
-                    capture.set(cv2.CAP_PROP_GAIN, value)
+            # A running camera takes the whole batch live; otherwise the settings apply on the next start
+            if running_source is not None and running_source.camera_is_running:
+                applied = running_source.apply_settings(updates, camera_settings)
 
             db.commit()
             db.refresh(camera_settings)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to update camera settings: {e}")
-        finally:
-            capture.release()
-        
-        return camera   
+
+        return {"camera_id": camera.id, "applied": applied}
+
                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                        
\ No newline at end of file
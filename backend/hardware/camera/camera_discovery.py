@@ -0,0 +1,66 @@
+import threading
+from typing import Dict, Optional
+
+from database.defectDetectionDB import SessionLocal
+from hardware.camera.camera import FrameSource
+from hardware.camera.external_camera import camera_fingerprint, enumerate_available_cameras
+
+
+class CameraHotplugWatcher:
+    """
+    Background thread that re-enumerates cameras periodically and updates the
+    camera registry when a device is plugged in or removed. Enumeration does not
+    open any device (providers that would have to are skipped); only cameras with a
+    new fingerprint get probed. A provider that does not answer a poll leaves its
+    cameras as they were instead of reporting them removed.
+    """
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self._known: Dict[str, str] = {}  # fingerprint -> provider name
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, known_fingerprints: Optional[Dict[str, str]] = None):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._known = dict(known_fingerprints or {})
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="camera-hotplug", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Camera hot-plug check failed: {e}")
+
+    def poll(self) -> bool:
+        """Enumerate once and update the registry if the set of devices changed. Returns True on change."""
+        available_cameras, answered = enumerate_available_cameras(open_devices=False)
+        fingerprints = {camera_fingerprint(camera): camera["provider"] for camera in available_cameras}
+        # Cameras of providers that did not answer this time are assumed unchanged
+        fingerprints.update({fingerprint: provider for fingerprint, provider in self._known.items()
+                             if provider not in answered})
+        if fingerprints.keys() == self._known.keys():
+            return False
+
+        added, removed = fingerprints.keys() - self._known.keys(), self._known.keys() - fingerprints.keys()
+        print(f"Camera hot-plug: {len(added)} added, {len(removed)} removed.")
+        db = SessionLocal()
+        try:
+            FrameSource().detect_and_save_cameras(db, available_cameras, answered)
+        finally:
+            db.close()
+        self._known = fingerprints
+        return True
+
+
+camera_hotplug_watcher = CameraHotplugWatcher()
@@ -0,0 +1,95 @@
+import threading
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from hardware.camera.camera import FrameSource
+
+
+class CameraManager:
+    """
+    Process-wide owner of the open cameras, keyed by camera id.
+
+    Every consumer (camera preview, detection feed, identify feed) acquires the
+    camera it needs and releases it when done. The device is opened on the first
+    acquire and closed on the last release, and all consumers read from the same
+    acquisition thread and ring buffer.
+    """
+
+    def __init__(self):
+        self._sources: Dict[int, FrameSource] = {}
+        self._refcounts: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        # One guard per camera, held while its device is opened or closed. Opening a device takes
+        # seconds, so it happens outside _lock and never blocks consumers of the other cameras.
+        self._device_locks: Dict[int, threading.Lock] = {}
+
+    def _device_lock(self, camera_id: int) -> threading.Lock:
+        with self._lock:
+            return self._device_locks.setdefault(camera_id, threading.Lock())
+
+    def acquire(self, camera_id: int, db: Session) -> FrameSource:
+        """
+        Return the running FrameSource for `camera_id`, starting the camera if nobody holds it yet.
+        Blocking (device open, node-map writes, database query): call it off the event loop.
+        """
+        if camera_id is None:
+            raise ValueError("Please provide a camera ID to start the camera.")
+
+        with self._device_lock(camera_id):
+            with self._lock:
+                source = self._sources.get(camera_id)
+                if source is not None and source.camera_is_running:
+                    self._refcounts[camera_id] += 1
+                    print(f"Camera {camera_id} acquired ({self._refcounts[camera_id]} consumer(s)).")
+                    return source
+
+            source = FrameSource(cam_id=camera_id)
+            source.start(camera_id, db)
+            with self._lock:
+                self._sources[camera_id] = source
+                # Consumers of a source that died still hold their reference and release it later
+                self._refcounts[camera_id] = self._refcounts.get(camera_id, 0) + 1
+                print(f"Camera {camera_id} acquired ({self._refcounts[camera_id]} consumer(s)).")
+            return source
+
+    def release(self, camera_id: int):
+        """
+        Drop one reference to `camera_id` and close the device once the last consumer is gone.
+        Closing joins the grab thread (up to a full trigger wait): call it off the event loop.
+        """
+        with self._device_lock(camera_id):
+            with self._lock:
+                if camera_id not in self._refcounts:
+                    print(f"Camera {camera_id} is not held by any consumer.")
+                    return
+                self._refcounts[camera_id] -= 1
+                if self._refcounts[camera_id] > 0:
+                    print(f"Camera {camera_id} released ({self._refcounts[camera_id]} consumer(s) left).")
+                    return
+                source = self._sources.pop(camera_id)
+                del self._refcounts[camera_id]
+            # Still under the camera's guard, so a new acquire does not reopen the device before it is closed
+            source.stop()
+
+    def get(self, camera_id: int) -> Optional[FrameSource]:
+        """Return the running FrameSource for `camera_id` without taking a reference."""
+        return self._sources.get(camera_id)
+
+    def consumers(self, camera_id: int) -> int:
+        return self._refcounts.get(camera_id, 0)
+
+    def running_cameras(self) -> List[int]:
+        return list(self._sources.keys())
+
+    def stop_all(self):
+        with self._lock:
+            sources = list(self._sources.values())
+            self._sources.clear()
+            self._refcounts.clear()
+        for source in sources:
+            source.stop()
+
+
+# Shared by every router in the process
+camera_manager = CameraManager()
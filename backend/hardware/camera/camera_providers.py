@@ -0,0 +1,267 @@
+import glob
+import os
+import re
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Set, Tuple
+
+import cv2
+
+try:
+    from pypylon import pylon
+except ImportError:  # pylon SDK not installed: Basler cameras are not enumerated
+    pylon = None
+
+try:
+    import win32com.client
+    import pythoncom
+except ImportError:  # Not on Windows: OpenCV cameras are found through V4L2 or index probing
+    win32com = None
+    pythoncom = None
+
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def get_usb_devices() -> List[Dict[str, str]]:
+    wmi = win32com.client.GetObject("winmgmts:")
+    devices = wmi.ExecQuery("SELECT * FROM Win32_PnPEntity WHERE Caption LIKE '%Camera%'")
+
+    cameras = []
+    for device in devices:
+        cameras.append({
+            "Caption": device.Caption,
+            "DeviceID": device.DeviceID
+        })
+
+    return cameras
+
+def detect_camera_type(camera_caption: str) -> str:
+    """Detect the type of camera based on its caption."""
+    if "Basler" in camera_caption:
+        return "basler"
+    elif "Camera" in camera_caption or "USB" in camera_caption:
+        return "opencv"
+    return "unknown"
+
+
+class CameraProvider:
+    """
+    Enumerates one family of cameras. `enumerate()` returns entries in the format of
+    get_available_cameras(): a dict with at least "type" and "caption".
+    """
+
+    name = "base"
+    # Camera.camera_type of the cameras this provider registers
+    registry_type = None
+
+    def is_available(self) -> bool:
+        return True
+
+    def opens_devices(self) -> bool:
+        """Whether enumerating has to open the devices (and may fail on one that is in use)."""
+        return False
+
+    def enumerate(self) -> List[Dict]:
+        raise NotImplementedError
+
+
+class PylonProvider(CameraProvider):
+    """Basler cameras found by the pylon transport layers."""
+
+    name = "pylon"
+    registry_type = "basler"
+
+    def is_available(self) -> bool:
+        return pylon is not None
+
+    def enumerate(self) -> List[Dict]:
+        cameras = []
+        for device in pylon.TlFactory.GetInstance().EnumerateDevices():
+            cameras.append({
+                "type": "basler",
+                "device": device,
+                "caption": device.GetModelName(),
+                "serial_number": device.GetSerialNumber()
+            })
+        return cameras
+
+
+class OpenCVProvider(CameraProvider):
+    """
+    UVC/USB cameras opened through cv2.VideoCapture(index).
+    Uses WMI on Windows, the V4L2 sysfs entries on Linux, and probes indices elsewhere.
+    """
+
+    name = "opencv"
+    registry_type = "regular"
+
+    def __init__(self, max_probe_index: int = 4):
+        self.max_probe_index = max_probe_index
+
+    def opens_devices(self) -> bool:
+        return win32com is None and not sys.platform.startswith("linux")
+
+    def enumerate(self) -> List[Dict]:
+        if win32com is not None:
+            return self._enumerate_wmi()
+        if sys.platform.startswith("linux"):
+            return self._enumerate_v4l2()
+        return self._enumerate_by_probing()
+
+    def _enumerate_wmi(self) -> List[Dict]:
+        # WMI needs COM initialised on the calling thread; providers run on worker threads
+        pythoncom.CoInitialize()
+        try:
+            usb_devices = get_usb_devices()
+        finally:
+            pythoncom.CoUninitialize()
+
+        cameras = []
+        for index, camera in enumerate(usb_devices):
+            if detect_camera_type(camera["Caption"]) == "opencv":
+                cameras.append({
+                    "type": "opencv",
+                    "index": index,
+                    "caption": camera["Caption"],
+                    "device_id": camera["DeviceID"]
+                })
+        return cameras
+
+    def _enumerate_v4l2(self) -> List[Dict]:
+        cameras = []
+        for path in sorted(glob.glob("/dev/video*")):
+            match = re.match(r"/dev/video(\d+)$", path)
+            if not match:
+                continue
+            sysfs = f"/sys/class/video4linux/video{match.group(1)}"
+            # UVC devices expose extra metadata nodes; only index 0 is the capture node
+            if self._read_sysfs(os.path.join(sysfs, "index"), "0") != "0":
+                continue
+            cameras.append({
+                "type": "opencv",
+                "index": int(match.group(1)),
+                "caption": self._read_sysfs(os.path.join(sysfs, "name"), f"Camera {match.group(1)}"),
+                "device_id": path
+            })
+        return cameras
+
+    def _enumerate_by_probing(self) -> List[Dict]:
+        cameras = []
+        for index in range(self.max_probe_index):
+            capture = cv2.VideoCapture(index)
+            try:
+                if capture.isOpened():
+                    cameras.append({
+                        "type": "opencv",
+                        "index": index,
+                        "caption": f"Camera {index}",
+                        "device_id": f"index:{index}"
+                    })
+            finally:
+                capture.release()
+        return cameras
+
+    @staticmethod
+    def _read_sysfs(path: str, default: str) -> str:
+        try:
+            with open(path, "r") as f:
+                return f.read().strip()
+        except OSError:
+            return default
+
+
+class FileProvider(CameraProvider):
+    """
+    Synthetic cameras backed by files: every video file, and every directory of images,
+    under `source_dir` (REPLAY_SOURCE_DIR, "replay_sources" by default) is one camera.
+    """
+
+    name = "file"
+    registry_type = "replay"
+
+    def __init__(self, source_dir: Optional[str] = None):
+        self.source_dir = source_dir or os.getenv("REPLAY_SOURCE_DIR", "replay_sources")
+
+    def is_available(self) -> bool:
+        return os.path.isdir(self.source_dir)
+
+    def enumerate(self) -> List[Dict]:
+        cameras = []
+        for entry in sorted(os.listdir(self.source_dir)):
+            path = os.path.abspath(os.path.join(self.source_dir, entry))
+            is_video = os.path.isfile(path) and entry.lower().endswith(VIDEO_EXTENSIONS)
+            is_image_dir = os.path.isdir(path) and any(
+                name.lower().endswith(IMAGE_EXTENSIONS) for name in os.listdir(path)
+            )
+            if is_video or is_image_dir:
+                cameras.append({
+                    "type": "replay",
+                    "caption": entry,
+                    "source": path,
+                    "device_id": path
+                })
+        return cameras
+
+
+DEFAULT_PROVIDERS: List[CameraProvider] = [PylonProvider(), OpenCVProvider(), FileProvider()]
+
+
+# One long-lived pool for every enumeration; a provider stuck in a driver call keeps its thread
+# and is skipped by later enumerations until it returns, so hung threads never pile up
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="camera-enum")
+_pending: Dict[str, Future] = {}
+_pending_lock = threading.Lock()
+
+
+def enumerate_cameras(providers: Optional[List[CameraProvider]] = None, timeout: float = 10.0,
+                      open_devices: bool = True) -> Tuple[List[Dict], Set[str]]:
+    """
+    Run every provider in parallel and concatenate their cameras, each tagged with its "provider".
+    Also returns the names of the providers that answered: a provider that fails, does not answer
+    within `timeout` seconds, is still busy with the previous call, or would have to open devices
+    when `open_devices` is False did not answer, and its cameras must be treated as unknown rather
+    than unplugged. An unavailable provider (e.g. no pylon SDK) answers with no cameras.
+    """
+    providers = providers or DEFAULT_PROVIDERS
+    answered = {provider.name for provider in providers if not provider.is_available()}
+
+    futures: Dict[str, Future] = {}
+    with _pending_lock:
+        for provider in providers:
+            if not provider.is_available():
+                continue
+            if not open_devices and provider.opens_devices():
+                continue
+            previous = _pending.get(provider.name)
+            if previous is not None and not previous.done():
+                print(f"Camera provider {provider.name} is still busy with the previous enumeration.")
+                continue
+            futures[provider.name] = _pending[provider.name] = _executor.submit(provider.enumerate)
+
+    if futures:
+        wait(futures.values(), timeout=timeout)
+
+    cameras = []
+    for name, future in futures.items():
+        if not future.done():
+            print(f"Camera provider {name} timed out after {timeout}s.")
+            continue
+        try:
+            provider_cameras = future.result()
+        except Exception as e:
+            print(f"Camera provider {name} failed: {e}")
+            continue
+        for camera in provider_cameras:
+            camera["provider"] = name
+        cameras.extend(provider_cameras)
+        answered.add(name)
+    return cameras, answered
+
+
+def registry_types(provider_names: Set[str], providers: Optional[List[CameraProvider]] = None) -> Set[str]:
+    """Camera.camera_type values registered by the named providers."""
+    return {provider.registry_type for provider in (providers or DEFAULT_PROVIDERS)
+            if provider.name in provider_names and provider.registry_type}
@@ -0,0 +1,94 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+class FrameBuffer:
+    """
+    Fixed-size ring of preallocated frames written by one acquisition thread
+    and read by any number of consumers.
+
+    The writer always fills the slot *after* the latest one, so readers can
+    copy the latest frame without holding the lock while the grabber keeps
+    running. A reader that is overtaken while copying simply retries.
+    """
+
+    def __init__(self, size: int = 4):
+        if size < 2:
+            raise ValueError("FrameBuffer needs at least 2 slots.")
+        self.size = size
+        self._slots = None  # Allocated on the first frame, once the shape is known
+        self._infos = [{} for _ in range(size)]
+        self._seq = -1  # Sequence number of the latest committed frame
+        self._condition = threading.Condition()
+        self._closed = False
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def slot_for(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """Return the next writable slot, (re)allocating the ring if the frame geometry changed."""
+        if self._slots is None or self._slots[0].shape != tuple(shape) or self._slots[0].dtype != dtype:
+            with self._condition:
+                self._slots = [np.empty(shape, dtype=dtype) for _ in range(self.size)]
+        return self._slots[(self._seq + 1) % self.size]
+
+    def commit(self, **info) -> int:
+        """Publish the slot returned by the last slot_for() call as the latest frame."""
+        with self._condition:
+            seq = self._seq + 1
+            info.setdefault("timestamp", time.time())
+            info["seq"] = seq
+            self._infos[seq % self.size] = info
+            self._seq = seq
+            self._condition.notify_all()
+        return seq
+
+    def write(self, frame: np.ndarray, **info) -> int:
+        """Copy a frame into the next slot and publish it."""
+        slot = self.slot_for(frame.shape, frame.dtype)
+        np.copyto(slot, frame)
+        return self.commit(**info)
+
+    def latest(self, copy: bool = True) -> Tuple[Optional[np.ndarray], Dict]:
+        """Return the most recent frame and its info, or (None, {}) if nothing was grabbed yet."""
+        while True:
+            seq = self._seq
+            if seq < 0:
+                return None, {}
+            index = seq % self.size
+            frame = self._slots[index]
+            info = self._infos[index]
+            if not copy:
+                return frame, info
+            frame = frame.copy()
+            # The writer is at most one slot ahead of `seq`; if it lapped the
+            # ring while we were copying, the copy may be torn.
+            if self._seq - seq < self.size - 1:
+                return frame, info
+
+    def wait_next(self, last_seq: int = -1, timeout: Optional[float] = None, copy: bool = True) -> Tuple[Optional[np.ndarray], Dict]:
+        """Block until a frame newer than `last_seq` is available and return it."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._seq > last_seq or self._closed, timeout=timeout):
+                return None, {}
+        if self._seq <= last_seq:
+            return None, {}
+        return self.latest(copy=copy)
+
+    def close(self):
+        """Wake every waiting consumer; the buffer stays readable."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def reset(self):
+        with self._condition:
+            self._closed = False
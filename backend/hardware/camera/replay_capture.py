@@ -0,0 +1,127 @@
+import os
+import random
+import time
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from hardware.camera.camera_providers import IMAGE_EXTENSIONS
+
+# Highest drop rate accepted; at 1.0 read() would never deliver a frame and never return
+MAX_DROP_RATE = 0.95
+
+
+class ReplayCapture:
+    """
+    Drop-in stand-in for cv2.VideoCapture that replays a video file or a directory
+    of images at a fixed frame rate, looping forever.
+
+    `jitter_ms` adds a random +/- delay to every frame and `drop_rate` is the
+    probability that a frame is silently skipped, to reproduce an unsteady camera.
+    """
+
+    def __init__(self, source: str, fps: float = 25.0, jitter_ms: float = 0.0, drop_rate: float = 0.0):
+        self.source = source
+        self.fps = fps if fps and fps > 0 else 25.0
+        self.jitter_ms = jitter_ms
+        self.drop_rate = drop_rate
+        self._video: Optional[cv2.VideoCapture] = None
+        self._images: List[str] = []
+        self._position = 0
+        self._next_deadline = None
+
+        if os.path.isdir(source):
+            self._images = sorted(
+                os.path.join(source, name) for name in os.listdir(source)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        elif os.path.isfile(source):
+            self._video = cv2.VideoCapture(source)
+
+    @property
+    def jitter_ms(self) -> float:
+        return self._jitter_ms
+
+    @jitter_ms.setter
+    def jitter_ms(self, value: Optional[float]):
+        self._jitter_ms = max(0.0, float(value or 0.0))
+
+    @property
+    def drop_rate(self) -> float:
+        return self._drop_rate
+
+    @drop_rate.setter
+    def drop_rate(self, value: Optional[float]):
+        # Clamped here so that both the constructor and live setting changes are covered
+        self._drop_rate = min(max(0.0, float(value or 0.0)), MAX_DROP_RATE)
+
+    def isOpened(self) -> bool:
+        return bool(self._images) or (self._video is not None and self._video.isOpened())
+
+    def _decode_next(self) -> Optional[np.ndarray]:
+        if self._images:
+            frame = cv2.imread(self._images[self._position % len(self._images)])
+            self._position += 1
+            return frame
+
+        success, frame = self._video.read()
+        if not success:
+            # Loop the file
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = self._video.read()
+        self._position += 1
+        return frame if success else None
+
+    def _wait_for_deadline(self):
+        period = 1.0 / self.fps
+        now = time.monotonic()
+        if self._next_deadline is None or now - self._next_deadline > period:
+            # First frame, or the consumer fell behind: restart the clock instead of bursting
+            self._next_deadline = now
+        self._next_deadline += period
+
+        delay = self._next_deadline - now
+        if self.jitter_ms:
+            delay += random.uniform(-self.jitter_ms, self.jitter_ms) / 1000.0
+        if delay > 0:
+            time.sleep(delay)
+
+    def read(self, image: Optional[np.ndarray] = None):
+        if not self.isOpened():
+            return False, None
+
+        self._wait_for_deadline()
+        while self.drop_rate and random.random() < self.drop_rate:
+            # Dropped frame: it is consumed from the source but never delivered
+            self._decode_next()
+            self._wait_for_deadline()
+
+        frame = self._decode_next()
+        if frame is None:
+            return False, None
+        if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def get(self, prop_id: int) -> float:
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._position)
+        if self._video is not None:
+            return self._video.get(prop_id)
+        return 0.0
+
+    def set(self, prop_id: int, value: float) -> bool:
+        if prop_id == cv2.CAP_PROP_FPS and value > 0:
+            self.fps = value
+            return True
+        return False
+
+    def release(self):
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+        self._images = []
@@ -11,12 +11,16 @@ from database.inspection import InspectionImage
 from detection.router import detection_router,identify_router
 from oauth2 import oauth2_routes
 from hardware.camera.camera import FrameSource
+from hardware.camera.camera_manager import camera_manager
 from database.defectDetectionDB import engine
+from database.schema_upgrade import upgrade_schema
 from database.users import session , user,role,profile
 from database.camera import camera_settings, camera
 from database.piece import piece,piece_image
 from fastapi.middleware.cors import CORSMiddleware
-from hardware.camera.external_camera import get_available_cameras
+from hardware.camera.external_camera import camera_fingerprint
+from hardware.camera.camera_discovery import camera_hotplug_watcher
+from detection.service.inference_pool import inference_pool
 
 
 
@@ -34,6 +38,8 @@ camera_settings.Base.metadata.create_all(bind=engine)
 piece.Base.metadata.create_all(bind=engine)
 piece_image.Base.metadata.create_all(bind=engine)
 InspectionImage.Base.metadata.create_all(bind=engine)
+# create_all() never alters an existing table: add the columns introduced since it was created
+upgrade_schema(engine)
 
 # Initialize roles on application startup
 
@@ -41,12 +47,9 @@ InspectionImage.Base.metadata.create_all(bind=engine)
 async def startup_event():
     db = next(get_db())
     create_admin_user(db)
-    frame_source.detect_and_save_cameras(db)
-   
-    cameras = get_available_cameras()
-    print("Available Cameras:")
-    for camera in cameras:
-        print(camera)
+    # Only cameras that are new since the last run get opened and probed
+    cameras = frame_source.detect_and_save_cameras(db)
+    camera_hotplug_watcher.start({camera_fingerprint(camera): camera["provider"] for camera in cameras})
     initialize_roles(db)
 
 
@@ -97,7 +100,12 @@ app.add_middleware(
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    frame_source.stop()
+    camera_hotplug_watcher.stop()
+    if detection_router.detection_engine is not None:
+        detection_router.detection_engine.stop()
+    identify_router.identify_engine.stop()
+    inference_pool.shutdown()
+    camera_manager.stop_all()
 
 @app.get("/")
 def read_root():